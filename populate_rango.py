@@ -6,7 +6,8 @@ os.environ.setdefault('DJANGO_SETTINGS_MODULE',
 import django
 django.setup()
 
-from rango.models import Category, Page
+from rango.models import Page
+from rango.loader import load_rows
 
 def populate():
     # First we will create lists of dictionaries containing the pages
@@ -49,33 +50,21 @@ def populate():
 
     # If you want to add more categories or pages
     # Add them to the dictionaries above which is the cats
-    # The code below goes through the cats dictionary, then adds each category 
-    # and add all the pages for that category
+    # The code below turns the cats dictionary into rows, one per category
+    # and one per page, and hands them to the bulk loader in rango/loader.py
+    rows = []
     for cat, cat_data in cats.items():
-
-        c = add_cat(cat, views=cat_data['views'], likes=cat_data['likes'])
+        rows.append({'kind': 'category', 'category': cat,
+                     'views': cat_data['views'], 'likes': cat_data['likes']})
         for p in cat_data['pages']:
-            add_page(c, p['title'], p['url'], p['views'])
-
-    for c in Category.objects.all():
-        for p in Page.objects.filter(category=c):
-            print(f'- {c}: {p}')
-
-
-def add_page(cat, title, url, views=0):
-    p = Page.objects.get_or_create(category=cat, title=title)[0]
-    p.url = url
-    p.views = views
-    p.save()
-    return p
+            rows.append({'kind': 'page', 'category': cat, 'title': p['title'],
+                         'url': p['url'], 'views': p['views']})
 
+    load_rows(rows)
 
-def add_cat(name, views=0, likes=0):
-    c = Category.objects.get_or_create(name=name)[0]
-    c.views = views
-    c.likes = likes
-    c.save()
-    return c
+    # One query for every page together with its category
+    for p in Page.objects.select_related('category').order_by('category_id', 'id'):
+        print(f'- {p.category}: {p}')
 
 
 # Start execution here!
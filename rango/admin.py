@@ -1,15 +1,145 @@
-from django.contrib import admin
+from django import forms
+from django.conf import settings
+from django.contrib import admin, messages
+from django.contrib.admin.helpers import ActionForm
+from django.contrib.admin.widgets import ForeignKeyRawIdWidget
+from django.core.exceptions import ValidationError
+from django.core.paginator import Paginator
+from django.db import connections
+from django.utils.functional import cached_property
+
+from rango import bulk
 from rango.models import Category, Page
 from rango.models import UserProfile
 
+# Above this many rows an unfiltered changelist shows the database's
+# estimate instead of running COUNT(*) over the whole table
+ESTIMATE_THRESHOLD = getattr(settings, 'RANGO_ADMIN_ESTIMATE_THRESHOLD', 100000)
+
+
+def estimated_rows(model, using):
+    # Postgres keeps a row estimate in its statistics. SQLite has none, but
+    # the largest rowid comes straight off the primary key b-tree.
+    connection = connections[using]
+    table = connection.ops.quote_name(model._meta.db_table)
+    if connection.vendor == 'postgresql':
+        sql = 'SELECT reltuples::bigint FROM pg_class WHERE oid = %s::regclass'
+        params = [model._meta.db_table]
+    elif connection.vendor == 'sqlite':
+        sql, params = f'SELECT MAX(rowid) FROM {table}', []
+    else:
+        return None
+
+    with connection.cursor() as cursor:
+        cursor.execute(sql, params)
+        row = cursor.fetchone()
+    return row[0] if row and row[0] is not None and row[0] >= 0 else None
+
+
+class EstimatedCountPaginator(Paginator):
+
+    @cached_property
+    def count(self):
+        queryset = self.object_list
+        # Filtered lists are usually small, and need an exact count anyway
+        if not queryset.query.where:
+            estimate = estimated_rows(queryset.model, queryset.db)
+            if estimate is not None and estimate > ESTIMATE_THRESHOLD:
+                return estimate
+        return super().count
+
+
+def range_filter(field, ranges):
+    # A list filter over an indexed integer field, e.g. views 100-999
+    class RangeListFilter(admin.SimpleListFilter):
+        title = field
+        parameter_name = f'{field}_range'
+
+        def lookups(self, request, model_admin):
+            return [(f'{low}-{"" if high is None else high}',
+                     f'{low}+' if high is None else (str(low) if low == high else f'{low}-{high}'))
+                    for low, high in ranges]
+
+        def queryset(self, request, queryset):
+            if not self.value():
+                return queryset
+            low, _, high = self.value().partition('-')
+            try:
+                queryset = queryset.filter(**{f'{field}__gte': int(low)})
+                if high:
+                    queryset = queryset.filter(**{f'{field}__lte': int(high)})
+            except ValueError:
+                return queryset
+            return queryset
+
+    return RangeListFilter
+
+
+COUNT_RANGES = ((0, 0), (1, 9), (10, 99), (100, 999), (1000, 9999), (10000, None))
+
+
+class MovePagesForm(ActionForm):
+    # Where "Move to category" puts the selected pages, a raw id box rather
+    # than a <select> listing every category
+    category = forms.ModelChoiceField(
+        queryset=Category.objects.all(), required=False,
+        widget=ForeignKeyRawIdWidget(Page._meta.get_field('category').remote_field, admin.site))
+
 
 class PageAdmin(admin.ModelAdmin):
     # The elements in this tuple are attributes in page model
-    list_display = ('title', 'category', 'url')
+    list_display = ('title', 'category', 'url', 'views')
+    # Fetch the category with a join rather than one query per row
+    list_select_related = ('category',)
+    list_filter = (range_filter('views', COUNT_RANGES),)
+    search_fields = ('^title',)
+    autocomplete_fields = ('category',)
+    # Owned by the view counters, Page.save() does not write it on updates.
+    # The "Reset views" action sets it.
+    readonly_fields = ('views',)
+
+    # No COUNT(*) over the whole table on every page load
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
+
+    action_form = MovePagesForm
+    actions = ('reset_views', 'move_to_category')
+
+    @admin.action(description='Reset views of selected pages')
+    def reset_views(self, request, queryset):
+        changed = bulk.reset_views(queryset)
+        self.message_user(request, f'Reset the views of {changed} pages.')
+
+    @admin.action(description='Move selected pages to category')
+    def move_to_category(self, request, queryset):
+        # Only our field, the form's action choices are filled in by the admin
+        try:
+            category = self.action_form.base_fields['category'].clean(request.POST.get('category'))
+        except ValidationError:
+            category = None
+        if category is None:
+            self.message_user(request, 'Choose the category to move the pages to.',
+                              level=messages.ERROR)
+            return
+
+        moved = bulk.move_pages(queryset, category)
+        self.message_user(request, f'Moved {moved} pages to {category}.')
 
 
 class CategoryAdmin(admin.ModelAdmin):
     prepopulated_fields = {'slug':('name',)}
+    list_display = ('name', 'page_count', 'total_page_views', 'likes')
+    list_filter = (range_filter('likes', COUNT_RANGES),)
+    # Used by the category autocomplete on pages too; a prefix match
+    search_fields = ('^name',)
+    # Alphabetical, read straight off the unique index on name
+    ordering = ('name',)
+    # Maintained from the pages, see Category.adjust_page_stats, and by the
+    # view and like counters. Category.save() does not write them on updates.
+    readonly_fields = Category.STATS_FIELDS + Category.COUNTER_FIELDS
+
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
 
 
 admin.site.register(Category, CategoryAdmin)
@@ -3,3 +3,9 @@ from django.apps import AppConfig
 
 class RangoConfig(AppConfig):
     name = 'rango'
+
+    def ready(self):
+        # Importing the modules connects the signal receivers and registers
+        # the system checks they define
+        from rango import signals  # noqa: F401
+        from rango import throttle  # noqa: F401
@@ -0,0 +1,241 @@
+import gzip
+import mimetypes
+import os
+import re
+import tempfile
+from email.utils import formatdate, parsedate_to_datetime
+
+from django.conf import settings
+from django.contrib.staticfiles.storage import ManifestStaticFilesStorage
+
+try:
+    import brotli
+except ImportError:
+    # Without the brotli package only gzip variants are made
+    brotli = None
+
+# Files worth compressing, images and fonts are compressed already
+COMPRESSIBLE = {'.css', '.js', '.mjs', '.json', '.map', '.svg', '.txt', '.xml', '.html', '.ico'}
+
+# Variants the WSGI layer may send, best first: (Accept-Encoding token, suffix)
+ENCODINGS = (('br', '.br'), ('gzip', '.gz'))
+
+# Names that change whenever the content does: collectstatic's manifest
+# hash (name.0123456789ab.css) and rango's content-addressed uploads
+# (see rango/images.py). They are cached for a year.
+HASHED_NAME = re.compile(r'(\.[0-9a-f]{12}\.[^/.]+$|^profile_images/.*[0-9a-f]{64})')
+IMMUTABLE = 'public, max-age=31536000, immutable'
+
+# Anything else may be replaced under the same name
+MAX_AGE = getattr(settings, 'RANGO_ASSET_MAX_AGE', 60 * 60)
+
+BLOCK_SIZE = 64 * 1024
+
+
+def _write_atomic(path, data):
+    with tempfile.NamedTemporaryFile(dir=os.path.dirname(path), delete=False) as tmp:
+        tmp.write(data)
+    os.replace(tmp.name, path)
+    os.chmod(path, 0o644)
+
+
+def compress_file(path):
+    # Write path.gz and path.br next to the file, keeping only the variants
+    # that come out smaller than the original
+    with open(path, 'rb') as f:
+        data = f.read()
+
+    variants = {'.gz': gzip.compress(data, compresslevel=9, mtime=0)}
+    if brotli is not None:
+        variants['.br'] = brotli.compress(data, quality=11)
+
+    written = []
+    for suffix, compressed in variants.items():
+        if len(compressed) < len(data):
+            _write_atomic(path + suffix, compressed)
+            written.append(path + suffix)
+    return written
+
+
+class CompressedManifestStaticFilesStorage(ManifestStaticFilesStorage):
+    # collectstatic copies files under their content hash and records the
+    # names in staticfiles.json, {% static %} looks them up there. On top of
+    # that every compressible file gets gzip and brotli variants, made once
+    # here instead of on every request.
+
+    def post_process(self, paths, dry_run=False, **options):
+        hashed_names = set()
+        for name, hashed_name, processed in super().post_process(paths, dry_run, **options):
+            if hashed_name and not isinstance(processed, Exception):
+                hashed_names.add(hashed_name)
+            yield name, hashed_name, processed
+
+        if dry_run:
+            return
+
+        for hashed_name in sorted(hashed_names):
+            if os.path.splitext(hashed_name)[1].lower() in COMPRESSIBLE:
+                compress_file(self.path(hashed_name))
+
+
+def _http_date(timestamp):
+    return formatdate(timestamp, usegmt=True)
+
+
+def _accepted_encodings(header):
+    # Tokens of an Accept-Encoding header, leaving out those refused with q=0
+    accepted = set()
+    for part in header.split(','):
+        token, _, params = part.partition(';')
+        quality = params.replace(' ', '').lower()
+        if quality.startswith('q=') and not quality[2:].strip('0.'):
+            continue
+        accepted.add(token.strip().lower())
+    return accepted
+
+
+def _parse_range(header, size):
+    # A single "bytes=start-end" or "bytes=-suffix" range as (start, end)
+    # inclusive. None means serve the whole file, False that the range
+    # can't be satisfied.
+    match = re.fullmatch(r'bytes=(\d*)-(\d*)', header.strip())
+    if match is None or match.groups() == ('', ''):
+        return None
+
+    start, end = match.groups()
+    if start == '':
+        length = int(end)
+        if length == 0:
+            return False
+        return max(size - length, 0), size - 1
+
+    start = int(start)
+    end = size - 1 if end == '' else min(int(end), size - 1)
+    if start >= size or start > end:
+        return False
+    return start, end
+
+
+def _read_slice(f, start, length):
+    try:
+        f.seek(start)
+        while length > 0:
+            block = f.read(min(BLOCK_SIZE, length))
+            if not block:
+                break
+            length -= len(block)
+            yield block
+    finally:
+        f.close()
+
+
+class AssetServer:
+    # WSGI middleware serving STATIC_ROOT and MEDIA_ROOT in front of Django,
+    # so files never go through the request/response machinery. Responses
+    # carry validators and far-future Cache-Control for hashed names, honour
+    # Range, pick a precompressed variant, and hand the open file to the
+    # server's wsgi.file_wrapper (sendfile under gunicorn). A path with no
+    # file behind it falls through to the application.
+
+    def __init__(self, application, mounts=None):
+        self.application = application
+        if mounts is None:
+            mounts = [(settings.STATIC_URL, settings.STATIC_ROOT),
+                      (settings.MEDIA_URL, settings.MEDIA_ROOT)]
+        self.mounts = [('/' + prefix.strip('/') + '/', os.path.realpath(root))
+                       for prefix, root in mounts if prefix and root]
+
+    def __call__(self, environ, start_response):
+        if environ.get('REQUEST_METHOD') in ('GET', 'HEAD'):
+            found = self._find(environ.get('PATH_INFO', ''))
+            if found is not None:
+                return self._serve(environ, start_response, *found)
+        return self.application(environ, start_response)
+
+    def _find(self, path_info):
+        # WSGI hands the path over as latin-1, file names are UTF-8
+        try:
+            path_info = path_info.encode('latin-1').decode('utf-8')
+        except UnicodeError:
+            return None
+        if '\x00' in path_info:
+            return None
+
+        for prefix, root in self.mounts:
+            if not path_info.startswith(prefix):
+                continue
+            name = path_info[len(prefix):]
+            path = os.path.realpath(os.path.join(root, name))
+            # realpath resolves "..", anything outside the root is refused
+            if os.path.commonpath([root, path]) == root and os.path.isfile(path):
+                return name, path
+        return None
+
+    def _serve(self, environ, start_response, name, path):
+        headers = [('Cache-Control', IMMUTABLE if HASHED_NAME.search(name)
+                    else f'public, max-age={MAX_AGE}')]
+        content_type, _ = mimetypes.guess_type(path)
+        headers.append(('Content-Type', content_type or 'application/octet-stream'))
+        # Browsers must not second-guess the type, e.g. run an upload as HTML
+        headers.append(('X-Content-Type-Options', 'nosniff'))
+
+        range_header = environ.get('HTTP_RANGE')
+        encoding = None
+        if os.path.splitext(path)[1].lower() in COMPRESSIBLE:
+            headers.append(('Vary', 'Accept-Encoding'))
+            # Ranges are served from the uncompressed file
+            if not range_header:
+                accepted = _accepted_encodings(environ.get('HTTP_ACCEPT_ENCODING', ''))
+                for token, suffix in ENCODINGS:
+                    if token in accepted and os.path.isfile(path + suffix):
+                        encoding, path = token, path + suffix
+                        headers.append(('Content-Encoding', token))
+                        break
+
+        stat = os.stat(path)
+        etag = f'"{stat.st_mtime_ns:x}-{stat.st_size:x}{"-" + encoding if encoding else ""}"'
+        headers += [('ETag', etag), ('Last-Modified', _http_date(stat.st_mtime)),
+                    ('Accept-Ranges', 'bytes')]
+
+        if self._not_modified(environ, etag, stat.st_mtime):
+            start_response('304 Not Modified', headers)
+            return []
+
+        status = '200 OK'
+        start, end = 0, stat.st_size - 1
+        if range_header and environ.get('HTTP_IF_RANGE', etag) == etag:
+            byte_range = _parse_range(range_header, stat.st_size)
+            if byte_range is False:
+                start_response('416 Range Not Satisfiable',
+                               headers + [('Content-Range', f'bytes */{stat.st_size}')])
+                return []
+            if byte_range is not None:
+                start, end = byte_range
+                status = '206 Partial Content'
+                headers.append(('Content-Range', f'bytes {start}-{end}/{stat.st_size}'))
+
+        length = end - start + 1
+        headers.append(('Content-Length', str(length)))
+        start_response(status, headers)
+
+        if environ['REQUEST_METHOD'] == 'HEAD':
+            return []
+
+        f = open(path, 'rb')
+        if status == '200 OK' and 'wsgi.file_wrapper' in environ:
+            return environ['wsgi.file_wrapper'](f, BLOCK_SIZE)
+        return _read_slice(f, start, length)
+
+    @staticmethod
+    def _not_modified(environ, etag, mtime):
+        if_none_match = environ.get('HTTP_IF_NONE_MATCH')
+        if if_none_match is not None:
+            return etag in [tag.strip() for tag in if_none_match.split(',')] or if_none_match.strip() == '*'
+
+        if_modified_since = environ.get('HTTP_IF_MODIFIED_SINCE')
+        if if_modified_since:
+            try:
+                return int(mtime) <= parsedate_to_datetime(if_modified_since).timestamp()
+            except (TypeError, ValueError):
+                return False
+        return False
@@ -0,0 +1,76 @@
+# Async versions of the read-only views in rango/views.py, served under
+# /rango/async/. Under ASGI (tango_with_django_project/asgi.py) they wait
+# for the database without holding a worker thread. The page query uses the
+# async query interface (Django 4.1+). Helpers that are sync only, like
+# rendering, sessions, the slug cache and the leaderboards, run through
+# sync_to_async.
+
+from asgiref.sync import sync_to_async
+from django.shortcuts import render
+
+from rango.models import Category, Page
+
+from rango import caching
+from rango import counters
+from rango import visitors
+from rango import response_cache
+from rango import linkcheck
+from rango.pagination import akeyset_page, decode_cursor
+from rango.views import INDEX_VERSIONS, index_cache_key, index_context
+
+arender = sync_to_async(render)
+
+
+async def index(request):
+    # The lists, key and context are built by the same helpers as the sync view
+    context_dict = await sync_to_async(index_context)()
+
+    await sync_to_async(visitors.track_visit)(request)
+    response, entry = await sync_to_async(response_cache.lookup)(
+        request, index_cache_key(context_dict), INDEX_VERSIONS)
+
+    if response is None:
+        response = await arender(request, 'rango/index.html', context=context_dict)
+        response = await sync_to_async(response_cache.store)(entry, response)
+
+    return visitors.save_visit(request, response)
+
+
+async def about(request):
+    visits = await sync_to_async(visitors.track_visit)(request)
+    response, entry = await sync_to_async(response_cache.lookup)(
+        request, f'about:{visits}', ['categories'])
+
+    if response is None:
+        response = await arender(request, 'rango/about.html', context={'visits': visits})
+        response = await sync_to_async(response_cache.store)(entry, response)
+
+    return visitors.save_visit(request, response)
+
+
+async def show_category(request, category_name_slug):
+    category = await sync_to_async(caching.resolve_category)(category_name_slug)
+    if category is None:
+        return await arender(request, 'rango/category.html',
+                             context={'category': None, 'pages': None})
+
+    counters.incr(Category, category['id'])
+
+    # Undecodable cursors share the first screen's cache entry
+    cursor = decode_cursor(request.GET.get('after', ''))
+    key = f'show_category:{category["id"]}:{cursor}'
+    versions = ['categories', response_cache.category_version(category['id'])]
+    response, entry = await sync_to_async(response_cache.lookup)(request, key, versions)
+
+    if response is None:
+        pages = (Page.objects.filter(category_id=category['id'])
+                 .select_related('link_status')
+                 .only('id', 'title', 'views', 'link_status__is_dead'))
+        pages = linkcheck.hide_dead(pages)
+        pages, next_cursor = await akeyset_page(pages, cursor)
+
+        context_dict = {'category': category, 'pages': pages, 'next_cursor': next_cursor}
+        response = await arender(request, 'rango/category.html', context=context_dict)
+        response = await sync_to_async(response_cache.store)(entry, response)
+
+    return response
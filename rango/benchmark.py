@@ -0,0 +1,301 @@
+import json
+import os
+import platform
+import random
+import re
+import shutil
+import socket
+import subprocess
+import threading
+import time
+import urllib.error
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+
+import django
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.db import connection
+from django.test import Client
+from django.test.utils import CaptureQueriesContext, override_settings
+from django.urls import reverse
+
+from rango import counters, loader
+from rango.middleware import percentile
+from rango.models import Category
+
+# Every route in rango/urls.py the harness knows how to request,
+# and whether it needs a logged in user
+ROUTES = {
+    'index': False,
+    'about': False,
+    'show_category': False,
+    'add_page': True,
+    'login': False,
+    'register': False,
+}
+
+BENCH_USERNAME = 'rango-bench'
+BENCH_PASSWORD = 'rango-bench-password'
+
+# QueryStatsMiddleware reports the query count in its Server-Timing header
+SERVER_TIMING_QUERIES = re.compile(r'desc="(\d+) queries"')
+
+
+def synthetic_rows(pages, categories, seed=0):
+    # Rows in the format rango.loader reads, views and likes follow a rough
+    # power law so the ranking queries have something to rank
+    rng = random.Random(seed)
+    names = [f'Category {number}' for number in range(categories)]
+
+    for name in names:
+        yield {'kind': 'category', 'category': name,
+               'views': int(rng.paretovariate(1.2) * 10),
+               'likes': int(rng.paretovariate(1.2) * 5)}
+
+    for number in range(pages):
+        yield {'kind': 'page', 'category': rng.choice(names),
+               'title': f'Page {number}',
+               'url': f'http://example.com/{number}/',
+               'views': int(rng.paretovariate(1.2) * 10)}
+
+
+def write_dataset(path, pages, categories, seed=0):
+    with open(path, 'w') as f:
+        for row in synthetic_rows(pages, categories, seed):
+            f.write(json.dumps(row) + '\n')
+
+
+def route_urls(slugs, names=None):
+    # A function per route that picks a concrete URL, category routes get a
+    # random slug. `names` replaces the URL name of some routes, e.g. to
+    # point them at the async views.
+    names = dict({route: f'rango:{route}' for route in ROUTES}, **(names or {}))
+
+    def url(route, with_slug):
+        if with_slug:
+            return lambda rng: reverse(names[route], args=[rng.choice(slugs)])
+        return lambda rng: reverse(names[route])
+
+    return {route: url(route, route in ('show_category', 'add_page')) for route in ROUTES}
+
+
+class ClientDriver:
+    # Drives the views in process through the Django test client
+
+    name = 'client'
+
+    def __init__(self, user=None):
+        self.user = user
+        self._local = threading.local()
+
+    def _client(self, login):
+        key = 'login' if login else 'anonymous'
+        client = getattr(self._local, key, None)
+        if client is None:
+            client = Client()
+            if login:
+                client.force_login(self.user)
+            setattr(self._local, key, client)
+        return client
+
+    def get(self, url, login):
+        with CaptureQueriesContext(connection) as queries:
+            started = time.perf_counter()
+            response = self._client(login).get(url)
+            elapsed = time.perf_counter() - started
+        return response.status_code, elapsed, len(queries)
+
+
+class HTTPDriver:
+    # Drives a running server over HTTP, e.g. one started with gunicorn
+
+    name = 'http'
+
+    def __init__(self, base_url, session_cookie=None):
+        self.base_url = base_url.rstrip('/')
+        self.session_cookie = session_cookie
+
+    def get(self, url, login):
+        request = urllib.request.Request(self.base_url + url)
+        if login and self.session_cookie:
+            request.add_header('Cookie', f'sessionid={self.session_cookie}')
+
+        started = time.perf_counter()
+        try:
+            with urllib.request.urlopen(request) as response:
+                response.read()
+                status = response.status
+                timing = response.headers.get('Server-Timing', '')
+        except urllib.error.HTTPError as e:
+            status = e.code
+            timing = e.headers.get('Server-Timing', '')
+        elapsed = time.perf_counter() - started
+
+        match = SERVER_TIMING_QUERIES.search(timing)
+        return status, elapsed, int(match.group(1)) if match else None
+
+
+def run_route(driver, make_url, login, requests, workers, seed=0):
+    def one(number):
+        rng = random.Random(seed + number)
+        return driver.get(make_url(rng), login)
+
+    # A few requests first so caches and connections are warm
+    for number in range(min(workers, requests)):
+        one(-number - 1)
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        samples = list(pool.map(one, range(requests)))
+    wall = time.perf_counter() - started
+
+    latencies = sorted(elapsed * 1000 for _, elapsed, _ in samples)
+    queries = [count for _, _, count in samples if count is not None]
+    errors = sum(1 for status, _, _ in samples if status >= 400)
+
+    return {
+        'requests': requests,
+        'errors': errors,
+        'throughput_rps': round(requests / wall, 1) if wall else None,
+        'latency_ms': {f'p{p}': round(percentile(latencies, p), 3) for p in (50, 95, 99)},
+        'queries_per_request': round(sum(queries) / len(queries), 2) if queries else None,
+    }
+
+
+def run(driver, routes, requests, workers, scale=None, seed=0, names=None):
+    slugs = list(Category.objects.values_list('slug', flat=True)[:1000])
+    urls = route_urls(slugs, names)
+
+    results = {}
+    for route in routes:
+        results[route] = run_route(driver, urls[route], ROUTES[route], requests, workers, seed)
+
+    return {
+        'meta': {
+            'driver': driver.name,
+            'workers': workers,
+            'requests_per_route': requests,
+            'scale': scale,
+            'django': django.get_version(),
+            'python': platform.python_version(),
+            'timestamp': time.strftime('%Y-%m-%dT%H:%M:%SZ', time.gmtime()),
+        },
+        'routes': results,
+    }
+
+
+# How to start each kind of server, and which views to point the shared
+# routes at on it. Both run against the database in settings.DATABASES.
+SERVERS = {
+    'wsgi': (['gunicorn', 'tango_with_django_project.wsgi:application',
+              '--workers', '{workers}', '--bind', '127.0.0.1:{port}'],
+             {}),
+    'asgi': (['uvicorn', 'tango_with_django_project.asgi:application',
+              '--workers', '{workers}', '--host', '127.0.0.1', '--port', '{port}'],
+             {'index': 'rango:async_index',
+              'about': 'rango:async_about',
+              'show_category': 'rango:async_show_category'}),
+}
+
+# The routes that exist in both a sync and an async version
+SERVER_ROUTES = ('index', 'about', 'show_category')
+
+
+def free_port():
+    with socket.socket() as s:
+        s.bind(('127.0.0.1', 0))
+        return s.getsockname()[1]
+
+
+@contextmanager
+def server(kind, workers, timeout=30):
+    command, _ = SERVERS[kind]
+    if shutil.which(command[0]) is None:
+        raise RuntimeError(f'{command[0]} is not installed, it is needed for the {kind} server')
+
+    port = free_port()
+    args = [part.format(workers=workers, port=port) for part in command]
+    process = subprocess.Popen(args, cwd=settings.BASE_DIR, env=dict(os.environ),
+                               stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+
+    try:
+        deadline = time.monotonic() + timeout
+        while True:
+            try:
+                socket.create_connection(('127.0.0.1', port), timeout=1).close()
+                break
+            except OSError:
+                if process.poll() is not None or time.monotonic() > deadline:
+                    raise RuntimeError(f'The {kind} server did not start')
+                time.sleep(0.2)
+
+        yield f'http://127.0.0.1:{port}'
+    finally:
+        process.terminate()
+        process.wait(timeout=10)
+
+
+def compare_servers(workers, concurrency, requests, seed=0):
+    # Same worker processes, same client concurrency, same routes: once
+    # through gunicorn and the sync views, once through uvicorn and the
+    # async ones
+    results = {}
+    for kind, (_, names) in SERVERS.items():
+        with server(kind, workers) as base_url:
+            results[kind] = run(HTTPDriver(base_url), SERVER_ROUTES, requests, concurrency,
+                                seed=seed, names=names)
+            results[kind]['meta']['server_workers'] = workers
+    return results
+
+
+def compare(previous, current):
+    # One line per route with the relative change in p95 latency and throughput
+    lines = []
+    for route, now in current['routes'].items():
+        before = previous.get('routes', {}).get(route)
+        if not before:
+            lines.append(f'{route}: no previous result')
+            continue
+
+        def change(old, new):
+            if not old or new is None:
+                return 'n/a'
+            return f'{(new - old) / old * 100:+.1f}%'
+
+        lines.append(
+            f'{route}: p95 {before["latency_ms"]["p95"]} -> {now["latency_ms"]["p95"]} ms '
+            f'({change(before["latency_ms"]["p95"], now["latency_ms"]["p95"])}), '
+            f'throughput {before["throughput_rps"]} -> {now["throughput_rps"]} rps '
+            f'({change(before["throughput_rps"], now["throughput_rps"])})')
+    return lines
+
+
+@contextmanager
+def seeded_database(pages, categories, seed=0):
+    # Seed a throwaway test database so the real one is never touched
+    old_name = connection.settings_dict['NAME']
+    connection.creation.create_test_db(verbosity=0, autoclobber=True, serialize=False)
+
+    # The test database only replaces 'default', so keep every read on it
+    # instead of letting the router send some to the real replica
+    no_routers = override_settings(DATABASE_ROUTERS=[])
+    no_routers.enable()
+
+    try:
+        loader.load_rows(synthetic_rows(pages, categories, seed), rebuild_search=False)
+        yield
+        # Write buffered counters while the test database still exists
+        counters.flush()
+    finally:
+        connection.creation.destroy_test_db(old_name, verbosity=0)
+        no_routers.disable()
+
+
+def bench_user():
+    user, created = User.objects.get_or_create(username=BENCH_USERNAME)
+    if created:
+        user.set_password(BENCH_PASSWORD)
+        user.save()
+    return user
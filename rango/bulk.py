@@ -0,0 +1,77 @@
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Count, Sum
+
+from rango import caching, leaderboard, response_cache
+from rango.models import Category
+
+# Rows changed per UPDATE (and per transaction) by the bulk actions
+CHUNK_SIZE = getattr(settings, 'RANGO_BULK_CHUNK_SIZE', 10000)
+
+
+def pk_ranges(queryset, size=CHUNK_SIZE):
+    # Split a queryset into consecutive primary key ranges of `size` rows.
+    # Each piece is the original filter plus pk bounds, so an UPDATE on it is
+    # one statement without a list of ids, and no transaction holds locks on
+    # more than `size` rows.
+    queryset = queryset.order_by('pk')
+    last = None
+    while True:
+        rest = queryset if last is None else queryset.filter(pk__gt=last)
+        upper = next(iter(rest.values_list('pk', flat=True)[size - 1:size]), None)
+        if upper is None:
+            yield rest
+            return
+        yield rest.filter(pk__lte=upper)
+        last = upper
+
+
+def _category_totals(pages):
+    return list(pages.order_by().values('category')
+                .annotate(pages=Count('id'), views=Sum('views')))
+
+
+def _after_commit(category_ids, sidebar=False):
+    def refresh():
+        for category_id in category_ids:
+            response_cache.invalidate_category(category_id)
+        if sidebar:
+            caching.invalidate_sidebar()
+        leaderboard.rebuild_all()
+    transaction.on_commit(refresh)
+
+
+def reset_views(pages):
+    # Set views to 0 on every page of the queryset and take what they had
+    # off their categories' total_page_views
+    changed = 0
+    category_ids = set()
+    for chunk in pk_ranges(pages.exclude(views=0)):
+        with transaction.atomic():
+            totals = _category_totals(chunk)
+            changed += chunk.update(views=0)
+            for row in totals:
+                Category.adjust_page_stats(row['category'], 0, -row['views'])
+                category_ids.add(row['category'])
+
+    if changed:
+        _after_commit(category_ids)
+    return changed
+
+
+def move_pages(pages, category):
+    # Move every page of the queryset to `category`, moving their counts along
+    moved = 0
+    category_ids = {category.pk}
+    for chunk in pk_ranges(pages.exclude(category=category)):
+        with transaction.atomic():
+            totals = _category_totals(chunk)
+            moved += chunk.update(category=category)
+            for row in totals:
+                Category.adjust_page_stats(row['category'], -row['pages'], -row['views'])
+                Category.adjust_page_stats(category.pk, row['pages'], row['views'])
+                category_ids.add(row['category'])
+
+    if moved:
+        _after_commit(category_ids, sidebar=True)
+    return moved
@@ -0,0 +1,109 @@
+import time
+
+from django.conf import settings
+from django.core.cache import caches
+
+from rango.models import Category
+
+# The cache alias rango keeps versions, the sidebar and slugs in, see CACHES
+# in settings.py. With LocMemCache every worker process has its own copy:
+# a bump_version() or invalidate_slugs() only reaches the process that made
+# it, the others catch up when their entries time out. Only a cache every
+# worker talks to (redis, memcached) makes invalidation immediate everywhere.
+CACHE_ALIAS = getattr(settings, 'RANGO_CACHE_ALIAS', 'default')
+
+# How long a cached sidebar may live even if nothing invalidates it. With a
+# per-process cache this is how long other workers may show an old one.
+SIDEBAR_TIMEOUT = getattr(settings, 'RANGO_SIDEBAR_TIMEOUT', 30)
+
+# How long a slug stays resolved in the cache, and how long we remember
+# that a slug does not exist. Same caveat as above for renamed categories.
+SLUG_TIMEOUT = getattr(settings, 'RANGO_SLUG_TIMEOUT', 30)
+MISSING_SLUG_TIMEOUT = getattr(settings, 'RANGO_MISSING_SLUG_TIMEOUT', 10)
+
+# What the slug cache remembers about a category, enough for the category
+# and add page views and templates
+CATEGORY_FIELDS = ('id', 'name', 'slug', 'views', 'likes')
+
+# Stored for slugs that do not exist, None already means "not cached"
+MISSING = 'missing'
+
+
+def get_cache():
+    return caches[CACHE_ALIAS]
+
+
+def _version_key(name):
+    return f'rango:version:{name}'
+
+
+def get_version(name):
+    # A version is a millisecond timestamp rather than a counter starting at 1.
+    # If the version key gets evicted we pick a brand new value, so entries
+    # stored under an old version can never be mistaken for fresh ones.
+    cache = get_cache()
+    key = _version_key(name)
+    version = cache.get(key)
+
+    if version is None:
+        version = int(time.time() * 1000)
+        # add() only writes if the key is missing, so two threads (or, with
+        # a shared cache, two workers) racing here agree on the same version
+        if not cache.add(key, version, timeout=None):
+            version = cache.get(key, version)
+
+    return version
+
+
+def bump_version(name):
+    # Moving to a new version makes every entry keyed on the old one
+    # unreachable; the cache's LRU culling takes care of the leftovers.
+    version = max(int(time.time() * 1000), get_version(name) + 1)
+    get_cache().set(_version_key(name), version, timeout=None)
+    return version
+
+
+def get_sidebar_categories():
+    cache = get_cache()
+    key = f'rango:sidebar:{get_version("categories")}'
+    categories = cache.get(key)
+
+    if categories is None:
+        # Only the fields categories.html needs, evaluated into a list so the
+        # cache stores rows rather than an unevaluated queryset. page_count is
+        # a column of its own, so no per-category COUNT is needed.
+        categories = list(Category.objects.only('id', 'name', 'slug', 'page_count').order_by('id'))
+        cache.set(key, categories, timeout=SIDEBAR_TIMEOUT)
+
+    return categories
+
+
+def invalidate_sidebar():
+    bump_version('categories')
+
+
+def _slug_key(slug):
+    return f'rango:slug:{slug}'
+
+
+def resolve_category(slug):
+    # Returns a dict of CATEGORY_FIELDS for the slug, or None if there is no
+    # such category. Unknown slugs are cached too, so a crawler asking for
+    # the same missing category over and over doesn't reach the database.
+    cache = get_cache()
+    key = _slug_key(slug)
+    category = cache.get(key)
+
+    if category is None:
+        category = Category.objects.filter(slug=slug).values(*CATEGORY_FIELDS).first()
+        if category is None:
+            cache.set(key, MISSING, MISSING_SLUG_TIMEOUT)
+        else:
+            cache.set(key, category, SLUG_TIMEOUT)
+        return category
+
+    return None if category == MISSING else category
+
+
+def invalidate_slugs(*slugs):
+    get_cache().delete_many([_slug_key(slug) for slug in slugs if slug])
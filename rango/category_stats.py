@@ -0,0 +1,40 @@
+from django.db import transaction
+from django.db.models import Count, Sum
+
+from rango import caching
+from rango import counters, db
+from rango.models import Category, Page
+
+
+def compute():
+    # COUNT and SUM for every category in one grouped query,
+    # {category_id: (page_count, total_page_views)}
+    rows = (Page.objects.order_by().values('category')
+            .annotate(pages=Count('id'), views=Sum('views')))
+    return {row['category']: (row['pages'], row['views'] or 0) for row in rows}
+
+
+def reconcile():
+    # Recompute Category.page_count and total_page_views from the pages and
+    # write the categories that drifted. Writes that bypass Page.save(), like
+    # bulk_create() and queryset update(), leave the copies behind.
+    # Increments still buffered in this process are written first.
+    counters.flush()
+
+    with transaction.atomic():
+        totals = compute()
+        changed = []
+        for category in Category.objects.only('id', 'page_count', 'total_page_views'):
+            page_count, total_page_views = totals.get(category.id, (0, 0))
+            if (category.page_count, category.total_page_views) != (page_count, total_page_views):
+                category.page_count = page_count
+                category.total_page_views = total_page_views
+                changed.append(category)
+
+        Category.objects.bulk_update(changed, Category.STATS_FIELDS,
+                                     batch_size=db.bulk_update_batch_size(Category.STATS_FIELDS))
+
+    if changed:
+        caching.invalidate_sidebar()
+
+    return len(changed)
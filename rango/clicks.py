@@ -0,0 +1,128 @@
+import atexit
+import logging
+import queue
+import threading
+import time
+from collections import Counter
+
+from django.conf import settings
+
+from rango import counters
+from rango.models import Page
+
+logger = logging.getLogger(__name__)
+
+# At most QUEUE_SIZE clicks wait for the background thread, anything beyond
+# that is dropped rather than slowing down the redirect
+QUEUE_SIZE = getattr(settings, 'RANGO_CLICK_QUEUE_SIZE', 10000)
+
+# How many clicks the background thread takes off the queue at once
+BATCH_SIZE = getattr(settings, 'RANGO_CLICK_BATCH_SIZE', 500)
+
+# Don't log the "queue full" warning more often than this (seconds)
+WARN_INTERVAL = 60
+
+
+class ClickRecorder:
+
+    def __init__(self, maxsize=QUEUE_SIZE, batch_size=BATCH_SIZE):
+        self.batch_size = batch_size
+        self._queue = queue.Queue(maxsize=maxsize)
+        self._thread = None
+        self._lock = threading.Lock()
+        # Held while a batch goes from the queue into the counter buffer
+        self._batch_lock = threading.Lock()
+        self._last_warning = 0
+        self._stats = {'enqueued': 0, 'dropped': 0, 'recorded': 0,
+                       'batches': 0, 'high_water': 0}
+
+    def record(self, page_id):
+        self._ensure_thread()
+
+        try:
+            self._queue.put_nowait(page_id)
+        except queue.Full:
+            with self._lock:
+                self._stats['dropped'] += 1
+                warn = time.monotonic() - self._last_warning > WARN_INTERVAL
+                if warn:
+                    self._last_warning = time.monotonic()
+            if warn:
+                logger.warning('Click queue is full (%d), dropping clicks',
+                               self._queue.maxsize)
+            return False
+
+        depth = self._queue.qsize()
+        with self._lock:
+            self._stats['enqueued'] += 1
+            if depth > self._stats['high_water']:
+                self._stats['high_water'] = depth
+        return True
+
+    def metrics(self):
+        with self._lock:
+            stats = dict(self._stats)
+        stats['depth'] = self._queue.qsize()
+        stats['capacity'] = self._queue.maxsize
+        return stats
+
+    def _ensure_thread(self):
+        if self._thread is not None:
+            return
+
+        with self._lock:
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run,
+                                                name='rango-click-recorder',
+                                                daemon=True)
+                self._thread.start()
+
+    def _run(self):
+        while True:
+            # Block for the first click, then take whatever else is waiting
+            batch = [self._queue.get()]
+            with self._batch_lock:
+                while len(batch) < self.batch_size:
+                    try:
+                        batch.append(self._queue.get_nowait())
+                    except queue.Empty:
+                        break
+                self._count(batch)
+
+    def _count(self, batch):
+        # Many clicks on the same page become one increment
+        for page_id, hits in Counter(batch).items():
+            counters.incr(Page, page_id, 'views', hits)
+
+        with self._lock:
+            self._stats['recorded'] += len(batch)
+            self._stats['batches'] += 1
+
+    def drain(self):
+        # Hand every queued click to the counter buffer now, e.g. at exit
+        with self._batch_lock:
+            batch = []
+            while True:
+                try:
+                    batch.append(self._queue.get_nowait())
+                except queue.Empty:
+                    break
+            if batch:
+                self._count(batch)
+        return len(batch)
+
+
+recorder = ClickRecorder()
+
+
+def record(page_id):
+    return recorder.record(page_id)
+
+
+def metrics():
+    return recorder.metrics()
+
+
+# Registered after rango.counters' own exit hook, so it runs first and the
+# counter buffer then writes (or spools) the drained clicks
+atexit.register(recorder.drain)
@@ -0,0 +1,279 @@
+import atexit
+import json
+import logging
+import os
+import threading
+import uuid
+from collections import defaultdict
+
+from django.apps import apps
+from django.conf import settings
+from django.db import transaction
+from django.db.models import F
+from django.dispatch import Signal
+
+from rango import db
+
+logger = logging.getLogger(__name__)
+
+# Increments are spread over several shards, each with its own lock,
+# so concurrent requests rarely wait on each other
+SHARDS = getattr(settings, 'RANGO_COUNTER_SHARDS', 16)
+
+# Pending increments are written out every FLUSH_INTERVAL seconds,
+# or sooner once FLUSH_THRESHOLD distinct rows are waiting
+FLUSH_INTERVAL = getattr(settings, 'RANGO_COUNTER_FLUSH_INTERVAL', 5.0)
+FLUSH_THRESHOLD = getattr(settings, 'RANGO_COUNTER_FLUSH_THRESHOLD', 1000)
+
+# Where a worker leaves the counts it could not write at shutdown,
+# the flush_counters command replays them
+SPOOL_DIR = getattr(settings, 'RANGO_COUNTER_SPOOL_DIR',
+                    os.path.join(settings.BASE_DIR, 'counter_spool'))
+
+# Counters that also add up into a field of the row a foreign key points
+# to, written in the same transaction:
+# (model_label, field) -> (foreign key, field on the related model)
+ROLLUPS = {
+    ('rango.Page', 'views'): ('category', 'total_page_views'),
+}
+
+# Sent after a flush has committed, with
+# updates = {(model_label, field): {pk: delta, ...}, ...}, ROLLUPS included
+counters_flushed = Signal()
+
+
+class CounterBuffer:
+
+    def __init__(self, shards=SHARDS, flush_interval=FLUSH_INTERVAL,
+                 flush_threshold=FLUSH_THRESHOLD):
+        self.flush_interval = flush_interval
+        self.flush_threshold = flush_threshold
+        self._locks = [threading.Lock() for _ in range(shards)]
+        self._counts = [defaultdict(int) for _ in range(shards)]
+        self._flush_lock = threading.Lock()
+        self._wakeup = threading.Event()
+        self._thread = None
+        self._thread_lock = threading.Lock()
+
+    def incr(self, model, pk, field='views', amount=1):
+        key = (model._meta.label, field, pk)
+        index = hash(key) % len(self._locks)
+
+        with self._locks[index]:
+            # Look the dict up under the lock, a flush may just have swapped it
+            counts = self._counts[index]
+            counts[key] += amount
+            pending = len(counts)
+
+        self._ensure_thread()
+
+        # Each shard holds roughly its share of the rows, so one full shard
+        # means the whole buffer is about to cross the threshold
+        if pending * len(self._locks) >= self.flush_threshold:
+            self._wakeup.set()
+
+    def pending_for(self, model, pk, field='views'):
+        # Increments for one row that have not been written yet
+        key = (model._meta.label, field, pk)
+        index = hash(key) % len(self._locks)
+        with self._locks[index]:
+            return self._counts[index].get(key, 0)
+
+    def pending(self):
+        merged = defaultdict(int)
+        for index, lock in enumerate(self._locks):
+            with lock:
+                for key, delta in self._counts[index].items():
+                    merged[key] += delta
+        return merged
+
+    def _take(self):
+        # Swap every shard for an empty dict, so incr() only ever waits
+        # for the time it takes to replace a reference
+        merged = defaultdict(int)
+        for index, lock in enumerate(self._locks):
+            with lock:
+                counts = self._counts[index]
+                self._counts[index] = defaultdict(int)
+            for key, delta in counts.items():
+                merged[key] += delta
+        return merged
+
+    def _restore(self, merged):
+        for (label, field, pk), delta in merged.items():
+            model = apps.get_model(label)
+            self.incr(model, pk, field, delta)
+
+    def flush(self):
+        with self._flush_lock:
+            merged = self._take()
+            if not merged:
+                return {}
+
+            updates = group_updates(merged)
+            try:
+                written = write_updates(updates)
+            except Exception:
+                # Nothing was committed, put the counts back so the next
+                # flush tries again
+                self._restore(merged)
+                raise
+
+            # The counts are in the database now, whatever the receivers do
+            # must not put them back in the buffer
+            notify(written)
+            return updates
+
+    def _ensure_thread(self):
+        if self._thread is not None:
+            return
+
+        with self._thread_lock:
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run,
+                                                name='rango-counter-flush',
+                                                daemon=True)
+                self._thread.start()
+
+    def _run(self):
+        while True:
+            self._wakeup.wait(self.flush_interval)
+            self._wakeup.clear()
+            try:
+                self.flush()
+            except Exception:
+                # The counts were restored, wait for the next round
+                pass
+
+    def spool(self):
+        # Last resort at shutdown: write whatever is pending to a file
+        # the flush_counters command can replay
+        merged = self._take()
+        if not merged:
+            return None
+
+        os.makedirs(SPOOL_DIR, exist_ok=True)
+        path = os.path.join(SPOOL_DIR, f'{os.getpid()}-{uuid.uuid4().hex}.json')
+        with open(path, 'w') as f:
+            json.dump([[label, field, pk, delta]
+                       for (label, field, pk), delta in merged.items()], f)
+        return path
+
+
+def group_updates(merged):
+    updates = defaultdict(dict)
+    for (label, field, pk), delta in merged.items():
+        if delta:
+            updates[(label, field)][pk] = delta
+    return dict(updates)
+
+
+def rollup_updates(updates):
+    # Turn the deltas of ROLLUPS counters into deltas for the related rows,
+    # e.g. page views into category total_page_views, with one query per
+    # batch of rows to find out where each of them points
+    rolled = {}
+    for (label, field), deltas in updates.items():
+        if (label, field) not in ROLLUPS:
+            continue
+
+        model = apps.get_model(label)
+        fk_name, target_field = ROLLUPS[(label, field)]
+        fk = model._meta.get_field(fk_name)
+        totals = rolled.setdefault((fk.related_model._meta.label, target_field), defaultdict(int))
+
+        pks = list(deltas)
+        for start in range(0, len(pks), db.SQLITE_BATCH_SIZE):
+            batch = pks[start:start + db.SQLITE_BATCH_SIZE]
+            for pk, target_pk in model.objects.filter(pk__in=batch).values_list('pk', fk.attname):
+                totals[target_pk] += deltas[pk]
+
+    return {key: dict(totals) for key, totals in rolled.items()}
+
+
+def _apply(model, field, deltas):
+    # Rows that got the same number of hits share one UPDATE, and F() makes
+    # the database do the addition so no increment from another worker is lost
+    by_delta = defaultdict(list)
+    for pk, delta in deltas.items():
+        by_delta[delta].append(pk)
+
+    for delta, pks in by_delta.items():
+        for start in range(0, len(pks), db.SQLITE_BATCH_SIZE):
+            batch = pks[start:start + db.SQLITE_BATCH_SIZE]
+            model.objects.filter(pk__in=batch).update(**{field: F(field) + delta})
+
+
+def write_updates(updates):
+    with transaction.atomic():
+        written = dict(updates)
+        for key, deltas in rollup_updates(updates).items():
+            merged = dict(written.get(key, {}))
+            for pk, delta in deltas.items():
+                merged[pk] = merged.get(pk, 0) + delta
+            written[key] = merged
+
+        for (label, field), deltas in written.items():
+            _apply(apps.get_model(label), field, deltas)
+
+    return written
+
+
+def notify(written):
+    # Send counters_flushed once the write has committed. send_robust()
+    # keeps one failing receiver from stopping the others or reaching
+    # the caller, its error is logged instead.
+    def send():
+        for receiver, response in counters_flushed.send_robust(sender=CounterBuffer,
+                                                               updates=written):
+            if isinstance(response, Exception):
+                logger.error('counters_flushed receiver %r failed', receiver,
+                             exc_info=response)
+
+    transaction.on_commit(send)
+
+
+def replay_spool():
+    # Apply every spooled file in its own transaction and delete it afterwards
+    replayed = 0
+    if not os.path.isdir(SPOOL_DIR):
+        return replayed
+
+    for name in sorted(os.listdir(SPOOL_DIR)):
+        if not name.endswith('.json'):
+            continue
+
+        path = os.path.join(SPOOL_DIR, name)
+        with open(path) as f:
+            rows = json.load(f)
+
+        merged = {(label, field, pk): delta for label, field, pk, delta in rows}
+        written = write_updates(group_updates(merged))
+        os.remove(path)
+        notify(written)
+        replayed += len(rows)
+
+    return replayed
+
+
+buffer = CounterBuffer()
+
+
+def incr(model, pk, field='views', amount=1):
+    buffer.incr(model, pk, field, amount)
+
+
+def pending_for(model, pk, field='views'):
+    return buffer.pending_for(model, pk, field)
+
+
+def flush():
+    return buffer.flush()
+
+
+@atexit.register
+def _flush_at_exit():
+    try:
+        buffer.flush()
+    except Exception:
+        buffer.spool()
@@ -0,0 +1,48 @@
+from django.conf import settings
+
+# PRAGMAs run on every new SQLite connection.
+# WAL lets readers carry on while a writer commits, synchronous=NORMAL only
+# syncs at checkpoints (safe in WAL mode), mmap_size and cache_size keep hot
+# pages in memory. How long a writer waits for the lock before failing with
+# "database is locked" is OPTIONS['timeout'] in DATABASES, which sqlite3
+# applies when it connects; a busy_timeout PRAGMA here would override it.
+SQLITE_PRAGMAS = getattr(settings, 'RANGO_SQLITE_PRAGMAS', {
+    'journal_mode': 'WAL',
+    'synchronous': 'NORMAL',
+    'mmap_size': 256 * 1024 * 1024,
+    'cache_size': -64 * 1024,
+    'temp_store': 'MEMORY',
+})
+
+# PRAGMAs that write to the database file, a read-only connection skips them
+WRITING_PRAGMAS = {'journal_mode'}
+
+# SQLite builds before 3.32 refuse statements with more than 999 bound
+# parameters. SQLITE_BATCH_SIZE is the rows per statement for pk__in
+# lookups and IN-list updates, which bind one parameter per row.
+SQLITE_MAX_PARAMS = 999
+SQLITE_BATCH_SIZE = 500
+
+
+def bulk_update_batch_size(fields):
+    # bulk_update() binds WHEN pk THEN value for every field of every row,
+    # plus the pk again in its IN list. Django's SQLite batch size counts one
+    # parameter per field and goes over the limit.
+    return SQLITE_MAX_PARAMS // (2 * len(fields) + 1)
+
+
+def is_read_only(connection):
+    settings_dict = connection.settings_dict
+    return bool(settings_dict.get('OPTIONS', {}).get('uri')) and 'mode=ro' in str(settings_dict['NAME'])
+
+
+def tune_connection(connection):
+    if connection.vendor != 'sqlite':
+        return
+
+    read_only = is_read_only(connection)
+    with connection.cursor() as cursor:
+        for name, value in SQLITE_PRAGMAS.items():
+            if read_only and name in WRITING_PRAGMAS:
+                continue
+            cursor.execute(f'PRAGMA {name} = {value}')
@@ -0,0 +1,99 @@
+import csv
+import json
+import zlib
+
+from django.conf import settings
+
+from rango.models import Category, Page
+
+# Rows fetched from the database at a time
+CHUNK_SIZE = getattr(settings, 'RANGO_EXPORT_CHUNK_SIZE', 2000)
+
+# Lines are gathered into blocks of about this many bytes before they are
+# handed on, so neither the socket nor gzip sees one tiny write per row
+BLOCK_SIZE = 64 * 1024
+
+FORMATS = {'csv': 'text/csv', 'jsonl': 'application/x-ndjson'}
+
+FIELDS = {
+    'categories': ('id', 'name', 'slug', 'views', 'likes'),
+    'pages': ('id', 'category_id', 'title', 'url', 'views'),
+}
+
+
+class Echo:
+    # csv.writer wants a file, this one hands every line straight back
+    def write(self, value):
+        return value
+
+
+def export_rows(kind, category_slug=None):
+    if kind == 'categories':
+        queryset = Category.objects.all()
+        if category_slug:
+            queryset = queryset.filter(slug=category_slug)
+    else:
+        queryset = Page.objects.all()
+        if category_slug:
+            queryset = queryset.filter(category__slug=category_slug)
+
+    # values_list() skips building model instances, iterator() skips the
+    # queryset cache, so only one chunk of rows is ever held in memory
+    rows = queryset.order_by('id').values_list(*FIELDS[kind])
+    return rows.iterator(chunk_size=CHUNK_SIZE)
+
+
+def csv_lines(fields, rows):
+    writer = csv.writer(Echo())
+    yield writer.writerow(fields)
+    for row in rows:
+        yield writer.writerow(row)
+
+
+def jsonl_lines(fields, rows):
+    for row in rows:
+        yield json.dumps(dict(zip(fields, row))) + '\n'
+
+
+def blocks(lines):
+    block = []
+    size = 0
+    for line in lines:
+        data = line.encode('utf-8')
+        block.append(data)
+        size += len(data)
+        if size >= BLOCK_SIZE:
+            yield b''.join(block)
+            block = []
+            size = 0
+    if block:
+        yield b''.join(block)
+
+
+def gzipped(chunks):
+    # wbits=31 makes zlib write a gzip header and trailer
+    compressor = zlib.compressobj(6, zlib.DEFLATED, 31)
+    for chunk in chunks:
+        data = compressor.compress(chunk)
+        if data:
+            yield data
+    yield compressor.flush()
+
+
+def export(kind, file_format='csv', category_slug=None, gzip=False):
+    # Returns an iterator of bytes, nothing is read before it is consumed
+    fields = FIELDS[kind]
+    rows = export_rows(kind, category_slug)
+    lines = csv_lines(fields, rows) if file_format == 'csv' else jsonl_lines(fields, rows)
+    chunks = blocks(lines)
+    return gzipped(chunks) if gzip else chunks
+
+
+def filename(kind, file_format, category_slug=None, gzip=False):
+    name = f'rango-{kind}'
+    if category_slug:
+        name += f'-{category_slug}'
+    name += f'.{file_format}'
+    if gzip:
+        name += '.gz'
+    return name
@@ -0,0 +1,66 @@
+import threading
+import time
+from collections import defaultdict, deque
+
+from django.conf import settings
+from django.contrib.auth import hashers
+
+from rango.middleware import percentile
+
+# PBKDF2 rounds for new hashes, None keeps Django's default. Django re-hashes
+# a password when its user logs in and the stored count differs, so raising
+# this upgrades accounts one login at a time.
+ITERATIONS = getattr(settings, 'RANGO_PASSWORD_ITERATIONS', None)
+
+# Hash timings kept per algorithm for the percentiles
+WINDOW = getattr(settings, 'RANGO_STATS_WINDOW', 1024)
+
+PERCENTILES = (50, 95, 99)
+
+
+class HashTimings:
+
+    def __init__(self, window=WINDOW):
+        self.window = window
+        self._lock = threading.Lock()
+        self._samples = defaultdict(lambda: deque(maxlen=self.window))
+        self._counts = defaultdict(int)
+
+    def record(self, algorithm, ms):
+        with self._lock:
+            self._samples[algorithm].append(ms)
+            self._counts[algorithm] += 1
+
+    def snapshot(self):
+        with self._lock:
+            samples = {algorithm: sorted(rows) for algorithm, rows in self._samples.items()}
+            counts = dict(self._counts)
+
+        report = {}
+        for algorithm, values in samples.items():
+            report[algorithm] = {'hashes': counts[algorithm], 'window': len(values)}
+            report[algorithm]['ms'] = {f'p{p}': percentile(values, p) for p in PERCENTILES}
+        return report
+
+
+timings = HashTimings()
+
+
+class TimedHasherMixin:
+    # encode() is where the work happens, verify() calls it too
+
+    def encode(self, password, salt, *args, **kwargs):
+        started = time.perf_counter()
+        try:
+            return super().encode(password, salt, *args, **kwargs)
+        finally:
+            timings.record(self.algorithm, (time.perf_counter() - started) * 1000)
+
+
+class PBKDF2PasswordHasher(TimedHasherMixin, hashers.PBKDF2PasswordHasher):
+    # Same algorithm name as Django's, so existing hashes verify unchanged
+    iterations = ITERATIONS or hashers.PBKDF2PasswordHasher.iterations
+
+
+class PBKDF2SHA1PasswordHasher(TimedHasherMixin, hashers.PBKDF2SHA1PasswordHasher):
+    pass
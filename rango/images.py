@@ -0,0 +1,128 @@
+import hashlib
+import logging
+import os
+import tempfile
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from PIL import Image, ImageOps
+
+logger = logging.getLogger(__name__)
+
+# Square bounding boxes the thumbnails are made for
+THUMBNAIL_SIZES = getattr(settings, 'RANGO_THUMBNAIL_SIZES', (64, 128, 256))
+THUMBNAIL_FORMAT = getattr(settings, 'RANGO_THUMBNAIL_FORMAT', 'WEBP')
+THUMBNAIL_QUALITY = getattr(settings, 'RANGO_THUMBNAIL_QUALITY', 80)
+
+# Threads resizing images in the background
+WORKERS = getattr(settings, 'RANGO_IMAGE_WORKERS', 2)
+
+# Relative to MEDIA_ROOT, the same folder UserProfile.picture uploads to
+UPLOAD_DIR = 'profile_images'
+THUMBNAIL_DIR = os.path.join(UPLOAD_DIR, 'thumbs')
+
+# Formats accepted for profile pictures, as PIL names them, and the
+# extension the saved file gets
+FORMATS = {'JPEG': '.jpg', 'PNG': '.png', 'GIF': '.gif', 'WEBP': '.webp'}
+
+executor = ThreadPoolExecutor(max_workers=WORKERS, thread_name_prefix='rango-images')
+
+# Thumbnails known to exist, so the template tag stops asking the disk
+_ready = set()
+
+
+def _media_path(name):
+    return os.path.join(settings.MEDIA_ROOT, name)
+
+
+def save_upload(uploaded_file):
+    # Write the upload to disk chunk by chunk while hashing it, then move it
+    # to a name made of its content hash. Identical pictures end up as one
+    # file, and the name changes whenever the content does, so it can be
+    # cached forever. The extension comes from the format PIL detects, never
+    # from the name the client sent. Raises ValueError for anything else.
+    directory = _media_path(UPLOAD_DIR)
+    os.makedirs(directory, exist_ok=True)
+
+    hasher = hashlib.sha256()
+    with tempfile.NamedTemporaryFile(dir=directory, delete=False) as tmp:
+        for chunk in uploaded_file.chunks():
+            hasher.update(chunk)
+            tmp.write(chunk)
+
+    try:
+        with Image.open(tmp.name) as image:
+            extension = FORMATS.get(image.format)
+    except OSError:
+        extension = None
+
+    if extension is None:
+        os.remove(tmp.name)
+        raise ValueError('Upload a JPEG, PNG, GIF or WebP picture.')
+
+    name = os.path.join(UPLOAD_DIR, hasher.hexdigest() + extension)
+    if os.path.exists(_media_path(name)):
+        os.remove(tmp.name)
+    else:
+        os.replace(tmp.name, _media_path(name))
+        os.chmod(_media_path(name), 0o644)
+
+    return name
+
+
+def thumbnail_name(name, size):
+    digest = os.path.splitext(os.path.basename(name))[0]
+    return os.path.join(THUMBNAIL_DIR, f'{digest}_{size}.{THUMBNAIL_FORMAT.lower()}')
+
+
+def make_thumbnails(name):
+    os.makedirs(_media_path(THUMBNAIL_DIR), exist_ok=True)
+
+    with Image.open(_media_path(name)) as original:
+        # Phones store the rotation in EXIF, apply it before resizing
+        image = ImageOps.exif_transpose(original)
+        if image.mode not in ('RGB', 'RGBA'):
+            image = image.convert('RGBA')
+
+        for size in THUMBNAIL_SIZES:
+            target = _media_path(thumbnail_name(name, size))
+            if os.path.exists(target):
+                continue
+
+            thumbnail = image.copy()
+            thumbnail.thumbnail((size, size), Image.LANCZOS)
+
+            # Write next to the target and rename, so nobody is ever served
+            # half a file
+            with tempfile.NamedTemporaryFile(dir=os.path.dirname(target), delete=False) as tmp:
+                thumbnail.save(tmp, THUMBNAIL_FORMAT, quality=THUMBNAIL_QUALITY)
+            os.replace(tmp.name, target)
+            os.chmod(target, 0o644)
+
+
+def _log_failure(future):
+    error = future.exception()
+    if error is not None:
+        logger.error('Could not make thumbnails: %r', error)
+
+
+def schedule_thumbnails(name):
+    # Resizing is left to the worker threads, the request that uploaded the
+    # picture does not wait for it
+    future = executor.submit(make_thumbnails, name)
+    future.add_done_callback(_log_failure)
+    return future
+
+
+def picture_url(name, size):
+    # The thumbnail for `size` once it has been made, the original until then
+    if not name:
+        return ''
+
+    if size in THUMBNAIL_SIZES:
+        thumbnail = thumbnail_name(name, size)
+        if thumbnail in _ready or os.path.exists(_media_path(thumbnail)):
+            _ready.add(thumbnail)
+            name = thumbnail
+
+    return settings.MEDIA_URL + name.replace(os.sep, '/')
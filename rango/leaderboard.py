@@ -0,0 +1,150 @@
+import threading
+import time
+
+from django.conf import settings
+
+from rango import caching, db
+from rango.models import Category, Page
+
+# How many rows the index page shows
+TOP_N = getattr(settings, 'RANGO_LEADERBOARD_SIZE', 5)
+
+# Extra rows kept below the visible top N, so a row that drops out can
+# usually be replaced without going back to the database
+SLACK = getattr(settings, 'RANGO_LEADERBOARD_SLACK', 20)
+
+# Every worker keeps its own leaderboards, this bounds how long one may lag
+# behind changes that were made in another process
+MAX_AGE = getattr(settings, 'RANGO_LEADERBOARD_MAX_AGE', 60)
+
+
+class Leaderboard:
+
+    def __init__(self, model, field, fields, size=TOP_N, slack=SLACK, max_age=MAX_AGE):
+        self.model = model
+        self.field = field
+        self.fields = fields
+        self.size = size
+        self.capacity = size + slack
+        self.max_age = max_age
+        self._lock = threading.Lock()
+
+        # pk -> row for the best `capacity` rows we know of
+        self._members = {}
+
+        # The highest score a row outside _members may have, None if there
+        # are no rows outside _members at all
+        self._outside = None
+
+        # The precomputed top N that top() hands out, None means rebuild
+        self._top = None
+        self._built_at = 0
+        self._version = None
+
+    def top(self):
+        version = caching.get_version('leaderboards')
+        top = self._top
+
+        if (top is None or version != self._version
+                or time.monotonic() - self._built_at > self.max_age):
+            top = self.rebuild(version)
+
+        return top
+
+    def rebuild(self, version=None):
+        # With an index on the score column this reads `capacity` rows off
+        # the index instead of sorting the whole table
+        rows = list(self.model.objects
+                    .order_by(f'-{self.field}', 'pk')
+                    .values(*self.fields)[:self.capacity])
+
+        with self._lock:
+            self._members = {row['id']: row for row in rows}
+            self._outside = rows[-1][self.field] if len(rows) == self.capacity else None
+            self._version = version if version is not None else caching.get_version('leaderboards')
+            self._built_at = time.monotonic()
+            self._publish()
+            return self._top
+
+    def update(self, rows):
+        # rows are dicts with self.fields, holding their current scores
+        with self._lock:
+            if not self._members and self._top is None:
+                # Never built in this process, top() will read it fresh
+                return
+
+            for row in rows:
+                pk = row['id']
+                score = row[self.field]
+
+                if pk in self._members or len(self._members) < self.capacity:
+                    self._members[pk] = row
+                elif score > self._lowest()[self.field]:
+                    self._members[pk] = row
+                elif self._outside is None or score > self._outside:
+                    self._outside = score
+
+            while len(self._members) > self.capacity:
+                lowest = self._lowest()
+                del self._members[lowest['id']]
+                if self._outside is None or lowest[self.field] > self._outside:
+                    self._outside = lowest[self.field]
+
+            self._publish()
+
+    def remove(self, pk):
+        with self._lock:
+            if self._members.pop(pk, None) is not None:
+                self._publish()
+
+    def refresh(self, pks):
+        # Re-read the given rows, used after their scores changed in the database
+        if not self._members and self._top is None:
+            return
+
+        pks = list(pks)
+        rows = []
+        for start in range(0, len(pks), db.SQLITE_BATCH_SIZE):
+            batch = pks[start:start + db.SQLITE_BATCH_SIZE]
+            rows.extend(self.model.objects.filter(pk__in=batch).values(*self.fields))
+        self.update(rows)
+
+    def _rank(self):
+        return sorted(self._members.values(), key=lambda row: (-row[self.field], row['id']))
+
+    def _lowest(self):
+        return min(self._members.values(), key=lambda row: (row[self.field], -row['id']))
+
+    def _publish(self):
+        top = self._rank()[:self.size]
+
+        # The top N is only trustworthy if no row we are not tracking could
+        # beat its last entry, otherwise let the next read rebuild it
+        if self._outside is not None and (len(top) < self.size or top[-1][self.field] < self._outside):
+            self._top = None
+        else:
+            self._top = top
+
+
+categories_by_likes = Leaderboard(Category, 'likes', ('id', 'name', 'slug', 'likes'))
+pages_by_views = Leaderboard(Page, 'views', ('id', 'title', 'url', 'views'))
+
+# The leaderboard to refresh when a counter on (model label, field) changes
+BOARDS = {
+    ('rango.Category', 'likes'): categories_by_likes,
+    ('rango.Page', 'views'): pages_by_views,
+}
+
+
+def top_categories():
+    return categories_by_likes.top()
+
+
+def top_pages():
+    return pages_by_views.top()
+
+
+def rebuild_all():
+    # Moving the version makes every worker rebuild on its next read
+    version = caching.bump_version('leaderboards')
+    return [board.rebuild(version) for board in BOARDS.values()]
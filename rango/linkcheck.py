@@ -0,0 +1,186 @@
+import asyncio
+import ssl
+import time
+from collections import defaultdict
+from urllib.parse import urlsplit
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Q
+from django.utils import timezone
+
+from rango import db, response_cache
+from rango.models import LinkStatus, Page
+
+# Connections open at the same time across all hosts
+CONCURRENCY = getattr(settings, 'RANGO_LINKCHECK_CONCURRENCY', 100)
+
+# Connections open at the same time to any one host
+PER_HOST = getattr(settings, 'RANGO_LINKCHECK_PER_HOST', 4)
+
+# Seconds to wait for a connection and for the status line
+TIMEOUT = getattr(settings, 'RANGO_LINKCHECK_TIMEOUT', 10)
+
+# Whether category pages leave out pages whose link is dead
+HIDE_DEAD_LINKS = getattr(settings, 'RANGO_HIDE_DEAD_LINKS', False)
+
+# Pages read, checked and written per round
+CHUNK_SIZE = 5000
+
+USER_AGENT = 'rango-linkcheck'
+
+
+class Result:
+
+    def __init__(self, status=None, latency_ms=None, error=''):
+        self.status = status
+        self.latency_ms = latency_ms
+        self.error = error[:200]
+
+    @property
+    def is_dead(self):
+        # Redirects count as alive, we only ask whether the URL answers
+        return self.status is None or self.status >= 400
+
+
+async def request_status(url, method, timeout):
+    parts = urlsplit(url)
+    if parts.scheme not in ('http', 'https') or not parts.hostname:
+        # Without a host open_connection() would quietly dial localhost
+        raise ValueError(f'not an http(s) URL with a host: {url!r}')
+    secure = parts.scheme == 'https'
+    default_port = 443 if secure else 80
+    port = parts.port or default_port
+    # Built from the hostname, never the netloc, so user:password stays out
+    host = f'[{parts.hostname}]' if ':' in parts.hostname else parts.hostname
+    if port != default_port:
+        host += f':{port}'
+    path = parts.path or '/'
+    if parts.query:
+        path += '?' + parts.query
+
+    context = ssl.create_default_context() if secure else None
+    reader, writer = await asyncio.wait_for(
+        asyncio.open_connection(parts.hostname, port, ssl=context), timeout)
+
+    try:
+        writer.write(f'{method} {path} HTTP/1.1\r\n'
+                     f'Host: {host}\r\n'
+                     f'User-Agent: {USER_AGENT}\r\n'
+                     'Connection: close\r\n\r\n'.encode('latin-1'))
+        await writer.drain()
+
+        # The status line is all we need, the rest of the response is dropped
+        line = await asyncio.wait_for(reader.readline(), timeout)
+        return int(line.split()[1])
+    finally:
+        writer.close()
+
+
+class LinkChecker:
+
+    def __init__(self, concurrency=CONCURRENCY, per_host=PER_HOST, timeout=TIMEOUT):
+        self.per_host = per_host
+        self.timeout = timeout
+        self._pool = asyncio.Semaphore(concurrency)
+        self._hosts = defaultdict(lambda: asyncio.Semaphore(self.per_host))
+
+    async def check(self, url):
+        host = urlsplit(url).hostname or ''
+        async with self._pool, self._hosts[host]:
+            started = time.perf_counter()
+            try:
+                status = await request_status(url, 'HEAD', self.timeout)
+                if status in (405, 501):
+                    # Some servers refuse HEAD, ask again the long way
+                    status = await request_status(url, 'GET', self.timeout)
+            except (OSError, asyncio.TimeoutError, ValueError, IndexError) as e:
+                return Result(error=f'{type(e).__name__}: {e}')
+            return Result(status, (time.perf_counter() - started) * 1000)
+
+    async def check_all(self, urls):
+        # Every distinct URL is checked once, however many pages share it
+        urls = list(set(urls))
+        results = await asyncio.gather(*(self.check(url) for url in urls))
+        return dict(zip(urls, results))
+
+
+def check_urls(urls, **options):
+    async def run():
+        # The semaphores belong to the loop asyncio.run() creates
+        return await LinkChecker(**options).check_all(urls)
+    return asyncio.run(run())
+
+
+def pages_to_check(max_age=None, after_id=0, count=CHUNK_SIZE):
+    pages = Page.objects.filter(id__gt=after_id).order_by('id')
+    if max_age is not None:
+        # Skip pages whose result is recent enough
+        cutoff = timezone.now() - max_age
+        pages = pages.filter(Q(link_status__isnull=True) | Q(link_status__last_checked__lt=cutoff))
+    return list(pages.values_list('id', 'category_id', 'url')[:count])
+
+
+def save_results(pages, results):
+    # pages are (id, category_id, url) rows, results map url to Result
+    now = timezone.now()
+    page_ids = [page_id for page_id, _, _ in pages]
+    batches = [page_ids[start:start + db.SQLITE_BATCH_SIZE]
+               for start in range(0, len(page_ids), db.SQLITE_BATCH_SIZE)]
+
+    was_dead = {}
+    for batch in batches:
+        was_dead.update(LinkStatus.objects.filter(page_id__in=batch)
+                        .values_list('page_id', 'is_dead'))
+
+    statuses = []
+    changed_categories = set()
+    for page_id, category_id, url in pages:
+        result = results[url]
+        statuses.append(LinkStatus(page_id=page_id, status=result.status,
+                                   latency_ms=result.latency_ms, error=result.error,
+                                   is_dead=result.is_dead, last_checked=now))
+        if was_dead.get(page_id, False) != result.is_dead:
+            changed_categories.add(category_id)
+
+    with transaction.atomic():
+        for batch in batches:
+            LinkStatus.objects.filter(page_id__in=batch).delete()
+        LinkStatus.objects.bulk_create(statuses, batch_size=db.SQLITE_BATCH_SIZE)
+
+    # Category pages show the dead link flag, refresh those that changed
+    for category_id in changed_categories:
+        transaction.on_commit(lambda category_id=category_id:
+                              response_cache.invalidate_category(category_id))
+
+    return sum(1 for status in statuses if status.is_dead)
+
+
+def check_pages(max_age=None, limit=None, chunk_size=CHUNK_SIZE, progress=None, **options):
+    # Walk the pages in id order one chunk at a time. Each chunk is a fresh
+    # query, so we never hold a cursor open on the tables we write to.
+    checked = dead = 0
+    after_id = 0
+
+    while limit is None or checked < limit:
+        count = chunk_size if limit is None else min(chunk_size, limit - checked)
+        batch = pages_to_check(max_age, after_id, count)
+        if not batch:
+            break
+
+        results = check_urls([url for _, _, url in batch], **options)
+        dead += save_results(batch, results)
+        checked += len(batch)
+        after_id = batch[-1][0]
+
+        if progress is not None:
+            progress(checked, dead)
+
+    return checked, dead
+
+
+def hide_dead(queryset):
+    # A LEFT JOIN on the status table keeps pages never checked
+    if HIDE_DEAD_LINKS:
+        queryset = queryset.filter(Q(link_status__isnull=True) | Q(link_status__is_dead=False))
+    return queryset
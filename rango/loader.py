@@ -0,0 +1,181 @@
+import csv
+import json
+import time
+from functools import lru_cache
+from itertools import islice
+
+from django.db import transaction
+from django.template.defaultfilters import slugify
+
+from rango import caching, category_stats, db, leaderboard, search_index
+from rango.models import Category, Page
+
+# Rows written per transaction. A chunk's lookups become IN (...) lists, and
+# pages are matched on (category, title), two lists of up to a chunk each.
+MAX_CHUNK_SIZE = db.SQLITE_BATCH_SIZE // 2
+CHUNK_SIZE = MAX_CHUNK_SIZE
+
+# Columns of a CSV file, JSONL rows use the same keys. For a category row
+# `category` is its name, for a page row it is the name of its category.
+FIELDS = ('kind', 'category', 'title', 'url', 'views', 'likes')
+
+
+# Category.save() would compute the slug, bulk_create() never calls it,
+# and the same names come up again and again in a page file
+@lru_cache(maxsize=10000)
+def category_slug(name):
+    return slugify(name)
+
+
+def read_rows(path, file_format=None):
+    # Yield one dict per row, never holding more than the current line
+    if file_format is None:
+        file_format = 'csv' if path.endswith('.csv') else 'jsonl'
+
+    with open(path, newline='', encoding='utf-8') as f:
+        if file_format == 'csv':
+            yield from csv.DictReader(f)
+        else:
+            for line in f:
+                line = line.strip()
+                if line:
+                    yield json.loads(line)
+
+
+def chunked(rows, size):
+    rows = iter(rows)
+    while True:
+        chunk = list(islice(rows, size))
+        if not chunk:
+            return
+        yield chunk
+
+
+def _int(value):
+    return int(value) if value not in (None, '') else 0
+
+
+class Loader:
+
+    def __init__(self, chunk_size=CHUNK_SIZE):
+        self.chunk_size = chunk_size
+        # slug -> id of every category seen so far, pages look theirs up here
+        self.category_ids = {}
+        self.stats = {'categories': 0, 'pages': 0, 'skipped': 0, 'seconds': 0.0}
+
+    def load(self, rows, progress=None):
+        started = time.monotonic()
+
+        for chunk in chunked(rows, self.chunk_size):
+            with transaction.atomic():
+                self._load_categories([row for row in chunk if row.get('kind') == 'category'])
+                self._load_pages([row for row in chunk if row.get('kind') == 'page'])
+
+            self.stats['seconds'] = time.monotonic() - started
+            if progress is not None:
+                progress(self.stats)
+
+        return self.stats
+
+    def _resolve_categories(self, slugs):
+        missing = [slug for slug in slugs if slug not in self.category_ids]
+        if missing:
+            self.category_ids.update(
+                Category.objects.filter(slug__in=missing).values_list('slug', 'id'))
+
+    def _load_categories(self, rows):
+        if not rows:
+            return
+
+        # The last row wins if a chunk names a category twice
+        wanted = {}
+        for row in rows:
+            name = row['category']
+            wanted[category_slug(name)] = Category(name=name,
+                                                   slug=category_slug(name),
+                                                   views=_int(row.get('views')),
+                                                   likes=_int(row.get('likes')))
+
+        existing = {c.slug: c for c in Category.objects.filter(slug__in=wanted.keys())}
+
+        to_update = []
+        to_create = []
+        for slug, category in wanted.items():
+            if slug in existing:
+                current = existing[slug]
+                current.views = category.views
+                current.likes = category.likes
+                to_update.append(current)
+            else:
+                to_create.append(category)
+
+        Category.objects.bulk_create(to_create)
+        Category.objects.bulk_update(to_update, ['views', 'likes'],
+                                     batch_size=db.bulk_update_batch_size(['views', 'likes']))
+
+        # SQLite does not hand back ids from bulk_create, read them in one go
+        self._resolve_categories([c.slug for c in to_create])
+        for category in to_update:
+            self.category_ids[category.slug] = category.id
+
+        self.stats['categories'] += len(wanted)
+
+    def _load_pages(self, rows):
+        if not rows:
+            return
+
+        self._resolve_categories({category_slug(row['category']) for row in rows})
+
+        # populate_rango.py matched pages on (category, title), so do we
+        wanted = {}
+        for row in rows:
+            category_id = self.category_ids.get(category_slug(row['category']))
+            if category_id is None:
+                self.stats['skipped'] += 1
+                continue
+
+            wanted[(category_id, row['title'])] = Page(category_id=category_id,
+                                                       title=row['title'],
+                                                       url=row['url'],
+                                                       views=_int(row.get('views')))
+
+        if not wanted:
+            return
+
+        existing = {}
+        for page in Page.objects.filter(category_id__in={key[0] for key in wanted},
+                                        title__in={key[1] for key in wanted}):
+            existing[(page.category_id, page.title)] = page
+
+        to_update = []
+        to_create = []
+        for key, page in wanted.items():
+            if key in existing:
+                current = existing[key]
+                current.url = page.url
+                current.views = page.views
+                to_update.append(current)
+            else:
+                to_create.append(page)
+
+        Page.objects.bulk_create(to_create)
+        Page.objects.bulk_update(to_update, ['url', 'views'],
+                                 batch_size=db.bulk_update_batch_size(['url', 'views']))
+
+        self.stats['pages'] += len(wanted)
+
+
+def refresh_derived_data(rebuild_search=True):
+    # bulk_create() and bulk_update() send no signals, so bring everything
+    # the signal receivers normally maintain up to date in one go
+    category_stats.reconcile()
+    caching.invalidate_sidebar()
+    leaderboard.rebuild_all()
+    if rebuild_search and search_index.is_available():
+        search_index.rebuild()
+
+
+def load_rows(rows, chunk_size=CHUNK_SIZE, progress=None, rebuild_search=True):
+    stats = Loader(chunk_size).load(rows, progress)
+    refresh_derived_data(rebuild_search)
+    return stats
@@ -0,0 +1,81 @@
+import json
+
+from django.core.management.base import BaseCommand, CommandError
+from django.test.utils import override_settings
+
+from rango import benchmark
+
+
+class Command(BaseCommand):
+    help = ('Benchmark the rango views against a synthetic database and write '
+            'throughput, latency percentiles and queries per request to JSON.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--pages', type=int, default=1000,
+                            help='pages to seed the throwaway database with')
+        parser.add_argument('--categories', type=int,
+                            help='categories to seed, defaults to one per 100 pages')
+        parser.add_argument('--requests', type=int, default=200,
+                            help='requests per route')
+        parser.add_argument('--workers', type=int, default=4,
+                            help='concurrent client threads')
+        parser.add_argument('--routes', default=','.join(benchmark.ROUTES),
+                            help='comma separated subset of routes')
+        parser.add_argument('--output', default='bench_results.json')
+        parser.add_argument('--compare', help='earlier results file to compare against')
+        parser.add_argument('--url',
+                            help='benchmark a running server at this address instead '
+                                 'of the test client, nothing is seeded')
+        parser.add_argument('--session-cookie',
+                            help='sessionid to send to --url for routes that need a login')
+        parser.add_argument('--write-dataset', metavar='PATH',
+                            help='only write a synthetic JSONL file for load_rango')
+        parser.add_argument('--seed', type=int, default=0)
+
+    def handle(self, *args, **options):
+        pages = options['pages']
+        categories = options['categories'] or max(pages // 100, 1)
+        scale = {'pages': pages, 'categories': categories}
+
+        routes = [route for route in options['routes'].split(',') if route]
+        unknown = set(routes) - set(benchmark.ROUTES)
+        if unknown:
+            raise CommandError(f'Unknown routes: {", ".join(sorted(unknown))}')
+
+        if options['write_dataset']:
+            benchmark.write_dataset(options['write_dataset'], pages, categories, options['seed'])
+            self.stdout.write(self.style.SUCCESS(f'Wrote {options["write_dataset"]}.'))
+            return
+
+        if options['url']:
+            driver = benchmark.HTTPDriver(options['url'], options['session_cookie'])
+            results = benchmark.run(driver, routes, options['requests'], options['workers'],
+                                    seed=options['seed'])
+        else:
+            results = self._run_in_process(routes, scale, options)
+
+        with open(options['output'], 'w') as f:
+            json.dump(results, f, indent=2, sort_keys=True)
+
+        for route, result in results['routes'].items():
+            self.stdout.write(
+                f'{route:>14}: {result["throughput_rps"]} rps, '
+                f'p50 {result["latency_ms"]["p50"]} ms, p95 {result["latency_ms"]["p95"]} ms, '
+                f'p99 {result["latency_ms"]["p99"]} ms, '
+                f'{result["queries_per_request"]} queries, {result["errors"]} errors')
+
+        if options['compare']:
+            with open(options['compare']) as f:
+                previous = json.load(f)
+            for line in benchmark.compare(previous, results):
+                self.stdout.write(line)
+
+        self.stdout.write(self.style.SUCCESS(f'Results written to {options["output"]}.'))
+
+    def _run_in_process(self, routes, scale, options):
+        self.stdout.write(f'Seeding {scale["categories"]} categories and {scale["pages"]} pages...')
+        with benchmark.seeded_database(scale['pages'], scale['categories'], options['seed']):
+            driver = benchmark.ClientDriver(benchmark.bench_user())
+            with override_settings(ALLOWED_HOSTS=['testserver']):
+                return benchmark.run(driver, routes, options['requests'], options['workers'],
+                                     scale=scale, seed=options['seed'])
@@ -0,0 +1,41 @@
+import json
+
+from django.core.management.base import BaseCommand, CommandError
+
+from rango import benchmark
+
+
+class Command(BaseCommand):
+    help = ('Compare the sync views under gunicorn (WSGI) with the async views under '
+            'uvicorn (ASGI) at the same number of worker processes. Both run against '
+            'the configured database, seed it with load_rango first.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--workers', type=int, default=2,
+                            help='server worker processes for both servers')
+        parser.add_argument('--concurrency', type=int, default=64,
+                            help='concurrent client connections')
+        parser.add_argument('--requests', type=int, default=2000,
+                            help='requests per route')
+        parser.add_argument('--output', default='bench_servers.json')
+        parser.add_argument('--seed', type=int, default=0)
+
+    def handle(self, *args, **options):
+        try:
+            results = benchmark.compare_servers(options['workers'], options['concurrency'],
+                                                options['requests'], options['seed'])
+        except RuntimeError as e:
+            raise CommandError(str(e))
+
+        with open(options['output'], 'w') as f:
+            json.dump(results, f, indent=2, sort_keys=True)
+
+        for route in benchmark.SERVER_ROUTES:
+            for kind, result in results.items():
+                row = result['routes'][route]
+                self.stdout.write(
+                    f'{route:>14} {kind}: {row["throughput_rps"]} rps, '
+                    f'p50 {row["latency_ms"]["p50"]} ms, p99 {row["latency_ms"]["p99"]} ms, '
+                    f'{row["errors"]} errors')
+
+        self.stdout.write(self.style.SUCCESS(f'Results written to {options["output"]}.'))
@@ -0,0 +1,46 @@
+import time
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand
+
+from rango import linkcheck
+
+
+class Command(BaseCommand):
+    help = 'Check every Page.url concurrently and record status and latency.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--concurrency', type=int, default=linkcheck.CONCURRENCY,
+                            help='connections open at once')
+        parser.add_argument('--per-host', type=int, default=linkcheck.PER_HOST,
+                            help='connections open at once to one host')
+        parser.add_argument('--timeout', type=float, default=linkcheck.TIMEOUT)
+        parser.add_argument('--max-age', type=float,
+                            help='skip pages checked less than this many hours ago')
+        parser.add_argument('--limit', type=int, help='check at most this many pages')
+        parser.add_argument('--every', type=float,
+                            help='keep running, starting a new pass every this many minutes')
+
+    def handle(self, *args, **options):
+        max_age = timedelta(hours=options['max_age']) if options['max_age'] is not None else None
+
+        def progress(checked, dead):
+            self.stdout.write(f'{checked} checked, {dead} dead', ending='\r')
+            self.stdout.flush()
+
+        while True:
+            started = time.monotonic()
+            checked, dead = linkcheck.check_pages(max_age=max_age,
+                                                  limit=options['limit'],
+                                                  progress=progress,
+                                                  concurrency=options['concurrency'],
+                                                  per_host=options['per_host'],
+                                                  timeout=options['timeout'])
+            elapsed = time.monotonic() - started
+            self.stdout.write('')
+            self.stdout.write(self.style.SUCCESS(
+                f'Checked {checked} pages in {elapsed:.1f}s, {dead} dead links.'))
+
+            if not options['every']:
+                break
+            time.sleep(max(options['every'] * 60 - elapsed, 0))
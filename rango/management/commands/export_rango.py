@@ -0,0 +1,31 @@
+import sys
+
+from django.core.management.base import BaseCommand
+
+from rango import export
+
+
+class Command(BaseCommand):
+    help = 'Stream every category or page to a CSV or JSONL file.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('kind', choices=sorted(export.FIELDS))
+        parser.add_argument('--format', choices=sorted(export.FORMATS), default='csv')
+        parser.add_argument('--category', help='only export this category slug')
+        parser.add_argument('--gzip', action='store_true')
+        parser.add_argument('--output', help='file to write, stdout if not given')
+
+    def handle(self, *args, **options):
+        chunks = export.export(options['kind'],
+                               file_format=options['format'],
+                               category_slug=options['category'],
+                               gzip=options['gzip'])
+
+        if options['output']:
+            with open(options['output'], 'wb') as f:
+                for chunk in chunks:
+                    f.write(chunk)
+        else:
+            for chunk in chunks:
+                sys.stdout.buffer.write(chunk)
+            sys.stdout.buffer.flush()
@@ -0,0 +1,16 @@
+from django.core.management.base import BaseCommand
+
+from rango import counters
+
+
+class Command(BaseCommand):
+    help = ('Replay the view counters web workers spooled to disk because they '
+            'could not write them at shutdown.')
+
+    def handle(self, *args, **options):
+        # Buffers are per process, a fresh command has none of its own; web
+        # workers flush theirs in the background and at exit. What they could
+        # not write then waits in RANGO_COUNTER_SPOOL_DIR.
+        replayed = counters.replay_spool()
+
+        self.stdout.write(self.style.SUCCESS(f'Replayed {replayed} spooled counter rows.'))
@@ -0,0 +1,44 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from rango import loader
+
+
+class Command(BaseCommand):
+    help = ('Bulk load categories and pages from a JSONL or CSV file. '
+            f'Each row has the keys {", ".join(loader.FIELDS)}.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('path')
+        parser.add_argument('--format', choices=['jsonl', 'csv'],
+                            help='defaults to csv for .csv files, jsonl otherwise')
+        parser.add_argument('--chunk-size', type=int, default=loader.CHUNK_SIZE,
+                            help=f'rows per transaction, at most {loader.MAX_CHUNK_SIZE}')
+        parser.add_argument('--skip-search-index', action='store_true',
+                            help='do not rebuild the search index afterwards')
+
+    def handle(self, *args, **options):
+        if not 1 <= options['chunk_size'] <= loader.MAX_CHUNK_SIZE:
+            raise CommandError(f'--chunk-size must be between 1 and {loader.MAX_CHUNK_SIZE}.')
+
+        def progress(stats):
+            rows = stats['categories'] + stats['pages']
+            rate = rows / stats['seconds'] if stats['seconds'] else 0
+            self.stdout.write(f'{rows} rows, {rate:.0f} rows/s', ending='\r')
+            self.stdout.flush()
+
+        try:
+            rows = loader.read_rows(options['path'], options['format'])
+            stats = loader.load_rows(rows,
+                                     chunk_size=options['chunk_size'],
+                                     progress=progress,
+                                     rebuild_search=not options['skip_search_index'])
+        except (OSError, ValueError, KeyError) as e:
+            raise CommandError(f'Could not load {options["path"]}: {e!r}')
+
+        rows = stats['categories'] + stats['pages']
+        rate = rows / stats['seconds'] if stats['seconds'] else 0
+        self.stdout.write('')
+        self.stdout.write(self.style.SUCCESS(
+            f'Loaded {stats["categories"]} categories and {stats["pages"]} pages '
+            f'in {stats["seconds"]:.1f}s ({rate:.0f} rows/s), '
+            f'skipped {stats["skipped"]} pages without a category.'))
@@ -0,0 +1,80 @@
+import random
+
+from django.core.management.base import BaseCommand, CommandError
+from django.test import Client
+from django.test.utils import override_settings
+
+from rango import benchmark, templating
+from rango.models import Category
+
+
+class Command(BaseCommand):
+    help = ('Render the rango pages against a synthetic database and report the '
+            'time spent per template and per tag. Templates that run queries '
+            'while rendering are flagged.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--pages', type=int, default=1000,
+                            help='pages to seed the throwaway database with')
+        parser.add_argument('--categories', type=int,
+                            help='categories to seed, defaults to one per 100 pages')
+        parser.add_argument('--requests', type=int, default=20,
+                            help='profiled requests per route')
+        parser.add_argument('--routes', default=','.join(benchmark.ROUTES),
+                            help='comma separated subset of routes')
+        parser.add_argument('--cold', action='store_true',
+                            help='do not warm templates and caches first, so '
+                                 'compiling shows up in the numbers')
+        parser.add_argument('--top', type=int, default=15, help='tags to list')
+        parser.add_argument('--seed', type=int, default=0)
+
+    def handle(self, *args, **options):
+        pages = options['pages']
+        categories = options['categories'] or max(pages // 100, 1)
+
+        routes = [route for route in options['routes'].split(',') if route]
+        unknown = set(routes) - set(benchmark.ROUTES)
+        if unknown:
+            raise CommandError(f'Unknown routes: {", ".join(sorted(unknown))}')
+
+        with benchmark.seeded_database(pages, categories, options['seed']):
+            # Logged in, so the response cache never answers in place of the templates
+            client = Client()
+            client.force_login(benchmark.bench_user())
+            urls = benchmark.route_urls(list(Category.objects.values_list('slug', flat=True)))
+            rng = random.Random(options['seed'])
+
+            with override_settings(ALLOWED_HOSTS=['testserver']):
+                if not options['cold']:
+                    templating.warm()
+                    for route in routes:
+                        client.get(urls[route](rng))
+
+                with templating.profiling() as profile:
+                    for route in routes:
+                        for _ in range(options['requests']):
+                            client.get(urls[route](rng))
+
+        self._report(profile, len(routes) * options['requests'], options['top'])
+
+    def _report(self, profile, requests, top):
+        self.stdout.write(f'Per request, averaged over {requests} requests:')
+        self.stdout.write('Templates (own time, without the templates and tags they render):')
+        templates = sorted(profile.templates.items(), key=lambda item: -item[1]['ms'])
+        for name, stats in templates:
+            line = (f'  {stats["ms"] / requests:>8.3f} ms  {stats["queries"] / requests:>6.2f} queries'
+                    f'  {name}')
+            self.stdout.write(self.style.WARNING(line) if stats['queries'] else line)
+
+        self.stdout.write(f'Slowest tags (including what they render), top {top}:')
+        tags = sorted(profile.tags.items(), key=lambda item: -item[1]['ms'])[:top]
+        for (name, tag), stats in tags:
+            self.stdout.write(f'  {stats["ms"] / requests:>8.3f} ms  {stats["calls"] / requests:>6.1f} calls'
+                              f'  {tag} in {name}')
+
+        flagged = [name for name, stats in templates if stats['queries']]
+        if flagged:
+            self.stdout.write(self.style.WARNING(
+                'Templates running queries while rendering: ' + ', '.join(flagged)))
+        else:
+            self.stdout.write(self.style.SUCCESS('No template ran a query while rendering.'))
@@ -0,0 +1,32 @@
+from django.contrib.sessions.models import Session
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.utils import timezone
+
+
+class Command(BaseCommand):
+    help = 'Delete expired sessions from the database in small batches.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=500,
+                            help='sessions deleted per transaction')
+
+    def handle(self, *args, **options):
+        # Small batches keep each write lock short, so the site keeps serving
+        # logins while a big backlog of expired sessions is cleared
+        now = timezone.now()
+        expired = Session.objects.filter(expire_date__lt=now)
+        deleted = 0
+
+        while True:
+            keys = list(expired.values_list('session_key', flat=True)[:options['batch_size']])
+            if not keys:
+                break
+
+            with transaction.atomic():
+                Session.objects.filter(session_key__in=keys).delete()
+            deleted += len(keys)
+
+        # The cached tiers expire on their own, each entry was stored with
+        # the session's remaining lifetime as its timeout
+        self.stdout.write(self.style.SUCCESS(f'Deleted {deleted} expired sessions.'))
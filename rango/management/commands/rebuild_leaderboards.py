@@ -0,0 +1,20 @@
+from django.core.management.base import BaseCommand
+
+from rango import leaderboard
+
+
+class Command(BaseCommand):
+    help = 'Rebuild the top-N leaderboards shown on the index page.'
+
+    def handle(self, *args, **options):
+        categories, pages = leaderboard.rebuild_all()
+
+        self.stdout.write('Most liked categories:')
+        for row in categories:
+            self.stdout.write(f'  {row["likes"]:>8}  {row["name"]}')
+
+        self.stdout.write('Most viewed pages:')
+        for row in pages:
+            self.stdout.write(f'  {row["views"]:>8}  {row["title"]}')
+
+        self.stdout.write(self.style.SUCCESS('Leaderboards rebuilt.'))
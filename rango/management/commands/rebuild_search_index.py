@@ -0,0 +1,14 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from rango import search_index
+
+
+class Command(BaseCommand):
+    help = 'Rebuild the full-text search index over categories and pages.'
+
+    def handle(self, *args, **options):
+        if not search_index.is_available():
+            raise CommandError('Search needs the SQLite backend with FTS5.')
+
+        indexed = search_index.rebuild()
+        self.stdout.write(self.style.SUCCESS(f'Indexed {indexed} categories and pages.'))
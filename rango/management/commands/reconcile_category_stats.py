@@ -0,0 +1,12 @@
+from django.core.management.base import BaseCommand
+
+from rango import category_stats
+
+
+class Command(BaseCommand):
+    help = ('Recompute the page_count and total_page_views of every category '
+            'from its pages.')
+
+    def handle(self, *args, **options):
+        changed = category_stats.reconcile()
+        self.stdout.write(self.style.SUCCESS(f'{changed} categories corrected.'))
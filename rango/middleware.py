@@ -0,0 +1,146 @@
+import math
+import threading
+import time
+from collections import defaultdict, deque
+from contextlib import ExitStack
+
+from django.conf import settings
+from django.db import connections
+from django.template.base import Template
+
+# How many recent requests per view the percentiles are computed over
+WINDOW = getattr(settings, 'RANGO_STATS_WINDOW', 1024)
+
+PERCENTILES = (50, 95, 99)
+
+_local = threading.local()
+
+
+class RequestMetrics:
+
+    def __init__(self):
+        self.queries = 0
+        self.sql_time = 0.0
+        self.template_time = 0.0
+        self.template_depth = 0
+
+    def __call__(self, execute, sql, params, many, context):
+        # Installed with connection.execute_wrapper(), sees every query
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.sql_time += time.perf_counter() - started
+            self.queries += 1
+
+
+class ViewStats:
+
+    def __init__(self, window=WINDOW):
+        self.window = window
+        self._lock = threading.Lock()
+        self._samples = defaultdict(lambda: deque(maxlen=self.window))
+        self._counts = defaultdict(int)
+
+    def record(self, view, sample):
+        with self._lock:
+            self._samples[view].append(sample)
+            self._counts[view] += 1
+
+    def snapshot(self):
+        # The percentiles are only worked out when someone asks for them,
+        # recording a request is a single append
+        with self._lock:
+            samples = {view: list(rows) for view, rows in self._samples.items()}
+            counts = dict(self._counts)
+
+        report = {}
+        for view, rows in samples.items():
+            report[view] = {'requests': counts[view], 'window': len(rows)}
+            for metric in ('queries', 'sql_ms', 'template_ms', 'total_ms', 'bytes'):
+                values = sorted(row[metric] for row in rows if row[metric] is not None)
+                report[view][metric] = {f'p{p}': percentile(values, p) for p in PERCENTILES}
+        return report
+
+    def reset(self):
+        with self._lock:
+            self._samples.clear()
+            self._counts.clear()
+
+
+def percentile(values, p):
+    # values must be sorted, nearest-rank method
+    if not values:
+        return None
+    rank = math.ceil(p / 100 * len(values))
+    return values[max(rank, 1) - 1]
+
+
+stats = ViewStats()
+
+
+def instrument_templates():
+    # Wrap Template.render once per process. Included templates and
+    # inclusion tags render inside their parent, so only the outermost
+    # render of a request is timed.
+    if getattr(Template.render, '_rango_instrumented', False):
+        return
+
+    original = Template.render
+
+    def render(self, context):
+        metrics = getattr(_local, 'metrics', None)
+        if metrics is None:
+            return original(self, context)
+
+        metrics.template_depth += 1
+        started = time.perf_counter()
+        try:
+            return original(self, context)
+        finally:
+            metrics.template_depth -= 1
+            if metrics.template_depth == 0:
+                metrics.template_time += time.perf_counter() - started
+
+    render._rango_instrumented = True
+    Template.render = render
+
+
+class QueryStatsMiddleware:
+    # Add 'rango.middleware.QueryStatsMiddleware' near the top of
+    # settings.MIDDLEWARE to collect per view query counts and timings.
+    # They are shown at rango:stats and sent in a Server-Timing header.
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        instrument_templates()
+
+    def __call__(self, request):
+        metrics = RequestMetrics()
+        _local.metrics = metrics
+        started = time.perf_counter()
+
+        try:
+            with ExitStack() as stack:
+                for connection in connections.all():
+                    stack.enter_context(connection.execute_wrapper(metrics))
+                response = self.get_response(request)
+        finally:
+            _local.metrics = None
+
+        total = time.perf_counter() - started
+        match = getattr(request, 'resolver_match', None)
+        view = match.view_name if match is not None else 'unresolved'
+        size = None if response.streaming else len(response.content)
+
+        stats.record(view, {'queries': metrics.queries,
+                            'sql_ms': metrics.sql_time * 1000,
+                            'template_ms': metrics.template_time * 1000,
+                            'total_ms': total * 1000,
+                            'bytes': size})
+
+        response['Server-Timing'] = (
+            f'db;dur={metrics.sql_time * 1000:.2f};desc="{metrics.queries} queries", '
+            f'tpl;dur={metrics.template_time * 1000:.2f}, '
+            f'total;dur={total * 1000:.2f}')
+        return response
@@ -1,4 +1,5 @@
-from django.db import models
+from django.db import models, transaction
+from django.db.models import F
 from django.template.defaultfilters import slugify
 from django.contrib.auth.models import User
 
@@ -12,13 +13,44 @@ class Category(models.Model):
     likes = models.IntegerField(default=0)
     slug = models.SlugField(unique=True)
 
+    # Copies of COUNT(*) and SUM(views) over the category's pages, so the
+    # sidebar never has to aggregate. Page.save(), the page post_delete
+    # receiver and the counter flush keep them up to date, the
+    # reconcile_category_stats command recomputes them from scratch.
+    page_count = models.IntegerField(default=0)
+    total_page_views = models.IntegerField(default=0)
+    STATS_FIELDS = ('page_count', 'total_page_views')
+
+    # Written by the counter flush (see rango/counters.py)
+    COUNTER_FIELDS = ('views', 'likes')
+
     def save(self, *args, **kwargs):
         self.slug = slugify(self.name)
+        if not self._state.adding and kwargs.get('update_fields') is None:
+            # An instance loaded a while ago holds stale stats and counts,
+            # leave those columns to the F() updates instead of writing them back
+            skipped = self.STATS_FIELDS + self.COUNTER_FIELDS
+            kwargs['update_fields'] = [field.name for field in self._meta.concrete_fields
+                                       if not field.primary_key and field.name not in skipped]
         super(Category, self).save(*args, **kwargs)
 
+    @classmethod
+    def adjust_page_stats(cls, category_id, pages=0, views=0):
+        # F() lets the database do the arithmetic, so concurrent changes to
+        # the same category add up instead of overwriting each other
+        if category_id is not None and (pages or views):
+            cls.objects.filter(pk=category_id).update(
+                page_count=F('page_count') + pages,
+                total_page_views=F('total_page_views') + views)
+
     class Meta:
         verbose_name_plural = 'Categories'
 
+        # The index page ranks categories by likes
+        indexes = [
+            models.Index(fields=['-likes'], name='rango_category_likes_idx'),
+        ]
+
     def __str__(self):
         return self.name
 
@@ -33,10 +65,91 @@ class Page(models.Model):
     url = models.URLField()
     views = models.IntegerField(default=0)
 
+    def save(self, *args, **kwargs):
+        # The page and its category's stats change in one transaction. A page
+        # moved to another category changes two categories, so note where it
+        # was before the save overwrites it (the signal receivers use it too).
+        with transaction.atomic():
+            previous = None
+            if not self._state.adding:
+                previous = (Page.objects.filter(pk=self.pk)
+                            .values_list('category_id', 'views').first())
+            self._old_category_id = previous[0] if previous else None
+
+            if previous is not None and kwargs.get('update_fields') is None:
+                # views belongs to the counter flush and its F() updates, an
+                # instance loaded a while ago would write a stale count back
+                kwargs['update_fields'] = [field.name for field in self._meta.concrete_fields
+                                           if not field.primary_key and field.name != 'views']
+
+            super(Page, self).save(*args, **kwargs)
+
+            if previous is None:
+                Category.adjust_page_stats(self.category_id, 1, self.views)
+                return
+
+            # What the row holds now, fields left out of update_fields kept
+            # their previous value
+            update_fields = kwargs.get('update_fields')
+
+            def saves(*names):
+                return update_fields is None or any(name in update_fields for name in names)
+
+            category_id = self.category_id if saves('category', 'category_id') else previous[0]
+            views = self.views if saves('views') else previous[1]
+
+            if category_id != previous[0]:
+                Category.adjust_page_stats(previous[0], -1, -previous[1])
+                Category.adjust_page_stats(category_id, 1, views)
+            else:
+                Category.adjust_page_stats(category_id, 0, views - previous[1])
+
+    class Meta:
+        # The index page ranks pages by views, the category page lists
+        # a category's pages by (-views, id), see rango/pagination.py
+        indexes = [
+            models.Index(fields=['-views'], name='rango_page_views_idx'),
+            models.Index(fields=['category', '-views', 'id'], name='rango_page_category_views_idx'),
+        ]
+
     def __str__(self):
         return self.title
 
 
+class CategoryLike(models.Model):
+    # One row per user and liked category, the unique constraint is what
+    # stops a user from liking the same category twice
+    user = models.ForeignKey(User, on_delete=models.CASCADE)
+    category = models.ForeignKey(Category, on_delete=models.CASCADE)
+    created = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['user', 'category'], name='rango_unique_category_like'),
+        ]
+
+    def __str__(self):
+        return f'{self.user} likes {self.category}'
+
+
+class LinkStatus(models.Model):
+    # The outcome of the last check of a page's URL, written by
+    # manage.py check_links (see rango/linkcheck.py)
+    page = models.OneToOneField(Page, on_delete=models.CASCADE, primary_key=True,
+                                related_name='link_status')
+    status = models.IntegerField(null=True)
+    latency_ms = models.FloatField(null=True)
+    error = models.CharField(max_length=200, blank=True)
+    is_dead = models.BooleanField(default=False)
+    last_checked = models.DateTimeField()
+
+    class Meta:
+        verbose_name_plural = 'Link statuses'
+
+    def __str__(self):
+        return f'{self.page_id}: {self.status or self.error}'
+
+
 class UserProfile(models.Model):
     # Link UserProfile to a User model instance
     user = models.OneToOneField(User, on_delete=models.CASCADE)
@@ -0,0 +1,59 @@
+from django.conf import settings
+from django.core import signing
+from django.db.models import Q
+
+# How many pages show_category lists per screen
+PAGE_SIZE = getattr(settings, 'RANGO_CATEGORY_PAGE_SIZE', 20)
+
+SALT = 'rango.pagination'
+
+
+def encode_cursor(views, pk):
+    # Signed so visitors cannot hand us made up positions, and opaque so
+    # we are free to change what goes into it later
+    return signing.dumps([views, pk], salt=SALT, compress=True)
+
+
+def decode_cursor(token):
+    if not token:
+        return None
+
+    try:
+        views, pk = signing.loads(token, salt=SALT)
+        return int(views), int(pk)
+    except (signing.BadSignature, TypeError, ValueError):
+        # A broken or tampered cursor simply means "start at the beginning"
+        return None
+
+
+def keyset_queryset(queryset, cursor=None, size=PAGE_SIZE):
+    # Pages are listed by (-views, id). Instead of an OFFSET, which makes the
+    # database walk past every earlier row, we continue right after the last
+    # row of the previous screen, so screen 1000 costs the same as screen 1.
+    queryset = queryset.order_by('-views', 'id')
+
+    if cursor is not None:
+        views, pk = cursor
+        queryset = queryset.filter(Q(views__lt=views) | Q(views=views, id__gt=pk))
+
+    # One row more than we show, to find out whether there is a next screen
+    return queryset[:size + 1]
+
+
+def split_page(rows, size=PAGE_SIZE):
+    next_cursor = None
+    if len(rows) > size:
+        last = rows[size - 1]
+        next_cursor = encode_cursor(last.views, last.id)
+
+    return rows[:size], next_cursor
+
+
+def keyset_page(queryset, cursor=None, size=PAGE_SIZE):
+    rows = list(keyset_queryset(queryset, cursor, size))
+    return split_page(rows, size)
+
+
+async def akeyset_page(queryset, cursor=None, size=PAGE_SIZE):
+    rows = [row async for row in keyset_queryset(queryset, cursor, size)]
+    return split_page(rows, size)
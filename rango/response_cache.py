@@ -0,0 +1,86 @@
+import hashlib
+import time
+
+from django.conf import settings
+from django.http import HttpResponse
+from django.utils.cache import get_conditional_response, patch_cache_control
+from django.utils.http import http_date, quote_etag
+
+from rango import caching
+
+# Upper bound on how long a cached page may be served. Invalidation is
+# precise for edits, but view counts reorder a category's pages without one,
+# so this is also how stale that ordering may get.
+TIMEOUT = getattr(settings, 'RANGO_RESPONSE_CACHE_TIMEOUT', 60)
+
+
+def category_version(category_id):
+    return f'category:{category_id}'
+
+
+def invalidate_category(category_id):
+    caching.bump_version(category_version(category_id))
+
+
+def lookup(request, key, versions):
+    # Returns (response, entry). The response is a 304 or a cached page when
+    # we have one, otherwise None and the caller builds the page and hands it
+    # to store() together with the entry. `key` says which variant of the
+    # page this is, `versions` names the versions (see rango.caching) whose
+    # change must produce a fresh page. Logged in users always get None.
+    if request.method not in ('GET', 'HEAD') or request.user.is_authenticated:
+        return None, None
+
+    stamps = [caching.get_version(name) for name in versions]
+    digest = hashlib.md5(f'{key}:{stamps}'.encode('utf-8')).hexdigest()
+    entry = {'request': request, 'cache_key': f'rango:response:{digest}'}
+
+    cached = caching.get_cache().get(entry['cache_key'])
+    if cached is None:
+        return None, entry
+
+    content, content_type, etag, last_modified = cached
+    response = get_conditional_response(request, etag=etag, last_modified=last_modified)
+    if response is None:
+        response = HttpResponse(content, content_type=content_type)
+    return _finish(response, etag, last_modified), entry
+
+
+def store(entry, response):
+    if entry is None or response.status_code != 200 or response.streaming:
+        return response
+
+    # The validators are taken from the body itself. Some changes reach the
+    # page without a version bump (view counts reordering pages, trending
+    # lists, dead link flags), so a page rebuilt after the entry expired
+    # must not keep the old ETag. A rebuild with the same body keeps it.
+    etag = quote_etag(hashlib.md5(response.content).hexdigest())
+    last_modified = int(time.time())
+
+    # Store only the body. Anything per visitor, like cookies, is
+    # added by the view after this returns.
+    caching.get_cache().set(entry['cache_key'],
+                            (response.content, response['Content-Type'], etag, last_modified),
+                            TIMEOUT)
+
+    # The client may already hold this very body. Only the ETag is compared,
+    # a date can't tell two bodies built in the same second apart.
+    not_modified = get_conditional_response(entry['request'], etag=etag)
+    return _finish(not_modified or response, etag, last_modified)
+
+
+def _finish(response, etag, last_modified):
+    response['ETag'] = etag
+    response['Last-Modified'] = http_date(last_modified)
+
+    # Let browsers keep the page, but ask us whether it is still current
+    patch_cache_control(response, max_age=0, must_revalidate=True)
+    return response
+
+
+def cached_anonymous(request, key, versions, build):
+    # Serve the response `build` would make from the cache for anonymous GETs
+    response, entry = lookup(request, key, versions)
+    if response is None:
+        response = store(entry, build())
+    return response
@@ -0,0 +1,61 @@
+import threading
+import time
+
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS, DatabaseError, connections
+
+# The alias reads of rango models go to, see DATABASES in settings.py
+REPLICA = getattr(settings, 'RANGO_READ_REPLICA', 'replica')
+
+# Seconds between checks of whether the replica still answers
+HEALTH_CHECK_INTERVAL = getattr(settings, 'RANGO_REPLICA_HEALTH_CHECK_INTERVAL', 30)
+
+
+class PrimaryReplicaRouter:
+    # Reads of rango models go to the read-only replica, everything else,
+    # and every read inside a transaction, goes to the primary ('default').
+    # If the replica stops answering, reads fall back to the primary until
+    # the next health check finds it working again.
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._checked_at = 0
+        self._healthy = True
+
+    def _replica_healthy(self):
+        now = time.monotonic()
+        if now - self._checked_at < HEALTH_CHECK_INTERVAL:
+            return self._healthy
+
+        with self._lock:
+            if now - self._checked_at >= HEALTH_CHECK_INTERVAL:
+                try:
+                    connection = connections[REPLICA]
+                    connection.ensure_connection()
+                    self._healthy = connection.is_usable()
+                except DatabaseError:
+                    self._healthy = False
+                self._checked_at = now
+
+        return self._healthy
+
+    def db_for_read(self, model, **hints):
+        if model._meta.app_label != 'rango' or REPLICA not in settings.DATABASES:
+            return None
+
+        # A transaction has to see its own writes
+        if connections[DEFAULT_DB_ALIAS].in_atomic_block:
+            return DEFAULT_DB_ALIAS
+
+        return REPLICA if self._replica_healthy() else DEFAULT_DB_ALIAS
+
+    def db_for_write(self, model, **hints):
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # Both aliases hold the same data
+        return True
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        # The replica gets its schema from the primary
+        return db != REPLICA
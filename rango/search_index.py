@@ -0,0 +1,158 @@
+import re
+
+from django.conf import settings
+from django.db import connection, transaction
+
+from rango.models import Category, Page
+
+# The FTS5 virtual table holding one row per page and per category
+TABLE = 'rango_search'
+
+RESULTS_PER_PAGE = getattr(settings, 'RANGO_SEARCH_RESULTS_PER_PAGE', 10)
+
+# How many rows the rebuild command inserts per executemany()
+REBUILD_CHUNK_SIZE = 2000
+
+# BM25 weights for the columns, in table order. The unindexed columns
+# get 0, a match in the title counts ten times more than one in the body.
+BM25_WEIGHTS = (0.0, 0.0, 0.0, 10.0, 1.0)
+
+# rowids are derived from the primary keys, pages on even and categories
+# on odd numbers, so updates and deletes go straight to the row
+KIND_OFFSETS = {'page': 0, 'category': 1}
+
+
+def is_available():
+    # FTS5 is an SQLite feature, on any other backend search is switched off
+    return connection.vendor == 'sqlite'
+
+
+def _rowid(kind, object_id):
+    return object_id * 2 + KIND_OFFSETS[kind]
+
+
+# Set once this process has made sure the table exists
+_index_ready = False
+
+
+def create_index(cursor):
+    global _index_ready
+    cursor.execute(
+        f'CREATE VIRTUAL TABLE IF NOT EXISTS {TABLE} USING fts5('
+        'kind UNINDEXED, object_id UNINDEXED, slug UNINDEXED, title, body, '
+        "tokenize = 'unicode61 remove_diacritics 2')")
+    _index_ready = True
+
+
+def ensure_index(cursor):
+    if not _index_ready:
+        create_index(cursor)
+
+
+def _page_row(page):
+    return (_rowid('page', page.id), 'page', page.id, '', page.title, page.url)
+
+
+def _category_row(category):
+    return (_rowid('category', category.id), 'category', category.id,
+            category.slug, category.name, '')
+
+
+def _replace(rows):
+    with transaction.atomic(), connection.cursor() as cursor:
+        ensure_index(cursor)
+        cursor.executemany(f'DELETE FROM {TABLE} WHERE rowid = %s',
+                           [(row[0],) for row in rows])
+        cursor.executemany(
+            f'INSERT INTO {TABLE} (rowid, kind, object_id, slug, title, body) '
+            'VALUES (%s, %s, %s, %s, %s, %s)', rows)
+
+
+def index_page(page):
+    if is_available():
+        _replace([_page_row(page)])
+
+
+def index_category(category):
+    if is_available():
+        _replace([_category_row(category)])
+
+
+def remove(kind, object_id):
+    if not is_available():
+        return
+
+    with connection.cursor() as cursor:
+        ensure_index(cursor)
+        cursor.execute(f'DELETE FROM {TABLE} WHERE rowid = %s', [_rowid(kind, object_id)])
+
+
+def rebuild():
+    # Recreate the table from scratch, streaming both tables in chunks
+    with connection.cursor() as cursor:
+        cursor.execute(f'DROP TABLE IF EXISTS {TABLE}')
+        create_index(cursor)
+
+    indexed = 0
+    sources = [
+        (Category.objects.only('id', 'name', 'slug'), _category_row),
+        (Page.objects.only('id', 'title', 'url'), _page_row),
+    ]
+
+    for queryset, make_row in sources:
+        rows = []
+        for obj in queryset.iterator(chunk_size=REBUILD_CHUNK_SIZE):
+            rows.append(make_row(obj))
+            if len(rows) >= REBUILD_CHUNK_SIZE:
+                _insert(rows)
+                indexed += len(rows)
+                rows = []
+        if rows:
+            _insert(rows)
+            indexed += len(rows)
+
+    with connection.cursor() as cursor:
+        # Merge the b-tree segments the bulk insert left behind
+        cursor.execute(f"INSERT INTO {TABLE} ({TABLE}) VALUES ('optimize')")
+
+    return indexed
+
+
+def _insert(rows):
+    # One transaction per chunk, SQLite would otherwise commit every row
+    with transaction.atomic(), connection.cursor() as cursor:
+        cursor.executemany(
+            f'INSERT INTO {TABLE} (rowid, kind, object_id, slug, title, body) '
+            'VALUES (%s, %s, %s, %s, %s, %s)', rows)
+
+
+def build_match(query):
+    # Never hand user input to MATCH as is, its query syntax would turn
+    # stray quotes or operators into errors. Every word becomes a quoted
+    # prefix term, and all of them have to match.
+    words = re.findall(r'\w+', query)
+    return ' '.join(f'"{word}"*' for word in words)
+
+
+def search(query, page_number=1, per_page=RESULTS_PER_PAGE):
+    # Returns (results, has_next). We fetch one row more than we show instead
+    # of counting every match, which would cost as much as the search itself.
+    match = build_match(query)
+    if not match or not is_available():
+        return [], False
+
+    offset = (page_number - 1) * per_page
+    weights = ', '.join(str(weight) for weight in BM25_WEIGHTS)
+
+    with connection.cursor() as cursor:
+        ensure_index(cursor)
+        cursor.execute(
+            f'SELECT kind, object_id, slug, title, body FROM {TABLE} '
+            f'WHERE {TABLE} MATCH %s ORDER BY bm25({TABLE}, {weights}) '
+            'LIMIT %s OFFSET %s',
+            [match, per_page + 1, offset])
+        rows = cursor.fetchall()
+
+    results = [{'kind': kind, 'id': object_id, 'slug': slug, 'title': title, 'url': body}
+               for kind, object_id, slug, title, body in rows[:per_page]]
+    return results, len(rows) > per_page
@@ -0,0 +1,100 @@
+import threading
+import time
+from collections import OrderedDict
+
+from django.conf import settings
+from django.contrib.sessions.backends.cached_db import SessionStore as CachedDBStore
+
+# The in-process tier in front of the shared cache. Entries live for at most
+# L1_TTL seconds, so a change made through another worker shows up quickly.
+# Until then it does not: a session logged out or deleted through another
+# worker stays valid here for up to L1_TTL seconds.
+L1_MAX_ENTRIES = getattr(settings, 'RANGO_SESSION_L1_MAX_ENTRIES', 10000)
+L1_TTL = getattr(settings, 'RANGO_SESSION_L1_TTL', 5)
+
+
+class LocalLRU:
+
+    def __init__(self, max_entries=L1_MAX_ENTRIES, ttl=L1_TTL):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            item = self._data.get(key)
+            if item is None:
+                return None
+
+            expires, value = item
+            if expires < time.monotonic():
+                del self._data[key]
+                return None
+
+            self._data.move_to_end(key)
+
+        # Hand out a copy, the caller is free to modify its session
+        return dict(value)
+
+    def set(self, key, value):
+        with self._lock:
+            self._data[key] = (time.monotonic() + self.ttl, dict(value))
+            self._data.move_to_end(key)
+            while len(self._data) > self.max_entries:
+                self._data.popitem(last=False)
+
+    def delete(self, key):
+        with self._lock:
+            self._data.pop(key, None)
+
+
+local_sessions = LocalLRU()
+
+
+class SessionStore(CachedDBStore):
+    # Three tiers: LocalLRU in this process, then the SESSION_CACHE_ALIAS
+    # cache shared by all workers, then the django_session table.
+    # Reads stop at the first tier that has the session, writes go through
+    # to all three, but only when the session data really changed.
+
+    cache_key_prefix = 'rango.session_backend'
+
+    def _serialize(self, data):
+        return self.serializer().dumps(data)
+
+    def load(self):
+        data = local_sessions.get(self.cache_key)
+        if data is None:
+            data = super().load()
+            if data and self.session_key:
+                local_sessions.set(self.cache_key, data)
+
+        self._loaded_state = self._serialize(data)
+        return data
+
+    def save(self, must_create=False):
+        # A view may set a key to the value it already had, which marks the
+        # session modified without changing anything worth writing
+        loaded_state = getattr(self, '_loaded_state', None)
+        if (not must_create and self.session_key is not None and loaded_state is not None
+                and self._serialize(self._get_session()) == loaded_state):
+            return
+
+        super().save(must_create)
+        if self.session_key is not None:
+            data = self._get_session(no_load=must_create)
+            local_sessions.set(self.cache_key, data)
+            self._loaded_state = self._serialize(data)
+
+    def delete(self, session_key=None):
+        if session_key is None:
+            session_key = self.session_key
+        if session_key is not None:
+            local_sessions.delete(self.cache_key_prefix + session_key)
+        super().delete(session_key)
+
+    def cycle_key(self):
+        # The data moves to a new key, make sure the next save writes it
+        self._loaded_state = None
+        super().cycle_key()
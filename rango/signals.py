@@ -0,0 +1,159 @@
+from django.db import DEFAULT_DB_ALIAS, connections, transaction
+from django.db.backends.signals import connection_created
+from django.db.models.signals import pre_save, post_save, pre_delete, post_delete, post_migrate
+from django.dispatch import receiver
+
+from rango import caching
+from rango import db
+from rango import leaderboard
+from rango import search_index
+from rango import trending
+from rango import response_cache
+from rango.counters import counters_flushed
+from rango.models import Category, Page
+
+
+@receiver(post_save, sender=Category)
+@receiver(post_delete, sender=Category)
+def category_changed(sender, instance, **kwargs):
+    # Wait for the transaction to commit, otherwise another request could
+    # refill the cache with the old rows before our change is visible
+    transaction.on_commit(caching.invalidate_sidebar)
+
+
+@receiver(post_save, sender=Category)
+@receiver(post_save, sender=Page)
+def update_leaderboard(sender, instance, **kwargs):
+    board = leaderboard.categories_by_likes if sender is Category else leaderboard.pages_by_views
+    row = {field: getattr(instance, field) for field in board.fields}
+    transaction.on_commit(lambda: board.update([row]))
+
+
+@receiver(post_delete, sender=Category)
+@receiver(post_delete, sender=Page)
+def remove_from_leaderboard(sender, instance, **kwargs):
+    board = leaderboard.categories_by_likes if sender is Category else leaderboard.pages_by_views
+    pk = instance.pk
+    transaction.on_commit(lambda: board.remove(pk))
+
+
+@receiver(counters_flushed)
+def refresh_leaderboards(sender, updates, **kwargs):
+    # The flush only knows the increments, so re-read the scores of the
+    # rows it touched for the boards that rank on that counter
+    for key, deltas in updates.items():
+        board = leaderboard.BOARDS.get(key)
+        if board is not None:
+            board.refresh(deltas.keys())
+
+
+@receiver(post_save, sender=Page)
+def index_page(sender, instance, **kwargs):
+    search_index.index_page(instance)
+
+
+@receiver(post_save, sender=Category)
+def index_category(sender, instance, **kwargs):
+    search_index.index_category(instance)
+
+
+@receiver(post_delete, sender=Page)
+def unindex_page(sender, instance, **kwargs):
+    search_index.remove('page', instance.pk)
+
+
+@receiver(post_delete, sender=Category)
+def unindex_category(sender, instance, **kwargs):
+    search_index.remove('category', instance.pk)
+
+
+@receiver(post_migrate)
+def create_search_index(sender, app_config, using, **kwargs):
+    # The search table lives on the primary, where rango's writes go
+    if (app_config.label == 'rango' and using == DEFAULT_DB_ALIAS
+            and search_index.is_available()):
+        with connections[using].cursor() as cursor:
+            search_index.create_index(cursor)
+
+
+@receiver(pre_save, sender=Category)
+def remember_category_slug(sender, instance, **kwargs):
+    # Category.save() recomputes the slug from the name, so a rename
+    # leaves the old slug cached unless we know what it was
+    instance._rango_old_slug = None
+    if instance.pk is not None:
+        instance._rango_old_slug = (Category.objects.filter(pk=instance.pk)
+                                    .values_list('slug', flat=True).first())
+
+
+@receiver(post_save, sender=Category)
+@receiver(post_delete, sender=Category)
+def invalidate_category_slug(sender, instance, **kwargs):
+    slugs = (instance.slug, getattr(instance, '_rango_old_slug', None))
+    transaction.on_commit(lambda: caching.invalidate_slugs(*slugs))
+
+
+@receiver(post_save, sender=Page)
+@receiver(post_delete, sender=Page)
+def invalidate_page_category(sender, instance, **kwargs):
+    # Page.save() notes the category a moved page came from
+    category_ids = {instance.category_id, getattr(instance, '_old_category_id', None)}
+    for category_id in category_ids - {None}:
+        transaction.on_commit(lambda category_id=category_id:
+                              response_cache.invalidate_category(category_id))
+
+
+@receiver(pre_delete, sender=Page)
+def remember_page_stats(sender, instance, **kwargs):
+    # The instance may be older than the last counter flush or a move, the
+    # category's stats were built from what the row holds
+    instance._rango_stored = (Page.objects.filter(pk=instance.pk)
+                              .values_list('category_id', 'views').first())
+
+
+@receiver(post_delete, sender=Page)
+def remove_page_stats(sender, instance, **kwargs):
+    # Deletes run in a transaction of their own, queryset deletes included,
+    # so the category's stats go down together with the page
+    stored = getattr(instance, '_rango_stored', None)
+    if stored is not None:
+        category_id, views = stored
+        Category.adjust_page_stats(category_id, -1, -views)
+
+
+@receiver(post_save, sender=Page)
+@receiver(post_delete, sender=Page)
+def page_count_changed(sender, instance, created=False, **kwargs):
+    # The sidebar shows each category's page count
+    moved = getattr(instance, '_old_category_id', None) not in (None, instance.category_id)
+    if created or moved or kwargs['signal'] is post_delete:
+        transaction.on_commit(caching.invalidate_sidebar)
+
+
+@receiver(post_save, sender=Category)
+@receiver(post_delete, sender=Category)
+def invalidate_category_page(sender, instance, **kwargs):
+    category_id = instance.pk
+    transaction.on_commit(lambda: response_cache.invalidate_category(category_id))
+
+
+@receiver(counters_flushed)
+def invalidate_liked_categories(sender, updates, **kwargs):
+    # Category pages show the like count, and the slug cache holds it
+    category_ids = list(updates.get(('rango.Category', 'likes'), {}))
+    for category_id in category_ids:
+        response_cache.invalidate_category(category_id)
+    if category_ids:
+        caching.invalidate_slugs(*Category.objects.filter(pk__in=category_ids)
+                                 .values_list('slug', flat=True))
+
+
+@receiver(counters_flushed)
+def record_trending(sender, updates, **kwargs):
+    # Views and likes land in this worker's trending buckets once written
+    trending.record(updates)
+
+
+@receiver(connection_created)
+def tune_connection(sender, connection, **kwargs):
+    db.tune_connection(connection)
@@ -1,9 +1,33 @@
 from django import template
-from rango.models import Category
+from rango.caching import get_sidebar_categories
+from rango.images import picture_url
+from rango import trending
 
 register = template.Library()
 
 @register.inclusion_tag('rango/categories.html')
 def get_category_list(current_category=None):
-    return { 'categories': Category.objects.all(),
+    # The list is shared by every page, the highlighting of the current
+    # category happens in the template so it never changes the cached entry
+    return { 'categories': get_sidebar_categories(),
             'current_category': current_category}
+
+
+@register.simple_tag
+def profile_picture_url(profile, size=128):
+    # e.g. <img src="{% profile_picture_url user.userprofile 64 %}" />
+    if not profile or not profile.picture:
+        return ''
+    return picture_url(profile.picture.name, int(size))
+
+
+@register.simple_tag
+def trending_categories():
+    # e.g. {% trending_categories as categories %}, rows have id, name, slug and score
+    return trending.trending_categories()
+
+
+@register.simple_tag
+def trending_pages():
+    # e.g. {% trending_pages as pages %}, rows have id, title, url and score
+    return trending.trending_pages()
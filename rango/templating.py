@@ -0,0 +1,119 @@
+import os
+import time
+from collections import defaultdict
+from contextlib import ExitStack, contextmanager
+
+from django.db import connections
+from django.template import engines
+from django.template.base import Node, TextNode
+from django.template.defaulttags import URLNode
+from django.template.utils import get_app_template_dirs
+from django.urls import NoReverseMatch, reverse
+
+# Templates below this folder are compiled at worker start
+WARM_PREFIX = 'rango'
+
+
+def template_names(prefix=WARM_PREFIX):
+    # Every template below `prefix` in the project and app template folders
+    engine = engines['django'].engine
+    names = set()
+    for directory in list(engine.dirs) + list(get_app_template_dirs('templates')):
+        root = os.path.join(directory, prefix)
+        for folder, _, files in os.walk(root):
+            for file_name in files:
+                if file_name.endswith('.html'):
+                    path = os.path.relpath(os.path.join(folder, file_name), directory)
+                    names.add(path.replace(os.sep, '/'))
+    return sorted(names)
+
+
+def warm(prefix=WARM_PREFIX):
+    # With the cached loader (settings.TEMPLATES when DEBUG is off) the
+    # compiled templates stay in memory, so the first request a worker serves
+    # no longer pays for reading and parsing them. Reversing one URL builds
+    # the resolver's reverse lookup table up front too.
+    engine = engines['django'].engine
+    names = template_names(prefix)
+    for name in names:
+        engine.get_template(name)
+
+    try:
+        reverse('rango:index')
+    except NoReverseMatch:
+        pass
+
+    return names
+
+
+def _tag_label(node):
+    if isinstance(node, URLNode):
+        return f'{{% url {node.view_name.token} %}}'
+    # simple_tag and inclusion_tag nodes keep the function they call
+    func = getattr(node, 'func', None)
+    if func is not None:
+        return f'{{% {func.__name__} %}}'
+    return type(node).__name__
+
+
+class RenderProfile:
+    # Time spent in each template (excluding the templates and tags it
+    # renders inside itself), time per tag (including them), and the
+    # queries run while a template's node was rendering
+
+    def __init__(self):
+        self.templates = defaultdict(lambda: {'nodes': 0, 'ms': 0.0, 'queries': 0})
+        self.tags = defaultdict(lambda: {'calls': 0, 'ms': 0.0})
+        self.queries_outside = 0
+        self._stack = []
+
+    def __call__(self, execute, sql, params, many, context):
+        # Installed with connection.execute_wrapper()
+        if self._stack:
+            self.templates[self._stack[-1][0]]['queries'] += 1
+        else:
+            self.queries_outside += 1
+        return execute(sql, params, many, context)
+
+    def wrap(self, render_annotated):
+        profile = self
+
+        def timed(node, context):
+            origin = getattr(node, 'origin', None)
+            name = getattr(origin, 'template_name', None) or '<string>'
+            frame = [name, 0.0]
+            profile._stack.append(frame)
+            started = time.perf_counter()
+            try:
+                return render_annotated(node, context)
+            finally:
+                elapsed = time.perf_counter() - started
+                profile._stack.pop()
+                if profile._stack:
+                    profile._stack[-1][1] += elapsed
+
+                stats = profile.templates[name]
+                stats['nodes'] += 1
+                stats['ms'] += (elapsed - frame[1]) * 1000
+                if not isinstance(node, TextNode):
+                    tag = profile.tags[(name, _tag_label(node))]
+                    tag['calls'] += 1
+                    tag['ms'] += elapsed * 1000
+
+        return timed
+
+
+@contextmanager
+def profiling():
+    # Profiles every render in this process until the block ends, meant for
+    # the profile_templates command rather than a running server
+    profile = RenderProfile()
+    original = Node.render_annotated
+    Node.render_annotated = profile.wrap(original)
+    try:
+        with ExitStack() as stack:
+            for connection in connections.all():
+                stack.enter_context(connection.execute_wrapper(profile))
+            yield profile
+    finally:
+        Node.render_annotated = original
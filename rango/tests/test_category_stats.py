@@ -0,0 +1,32 @@
+from django.db import connection
+from django.test import TestCase
+
+from rango import category_stats
+from rango.models import Category, Page
+
+
+class ReconcileTests(TestCase):
+
+    def test_fixes_drift_within_sqlite_parameter_limit(self):
+        Category.objects.bulk_create(Category(name=f'Category {n}', slug=f'category-{n}')
+                                     for n in range(400))
+        category = Category.objects.get(slug='category-0')
+        # bulk_create() skips Page.save(), so none of the stats moved
+        Page.objects.bulk_create([Page(category=category, title='Docs',
+                                       url='https://example.com/', views=4)])
+        Category.objects.update(page_count=1)
+
+        bound = []
+
+        def record(execute, sql, params, many, context):
+            if not many:
+                bound.append(len(params or ()))
+            return execute(sql, params, many, context)
+
+        with connection.execute_wrapper(record):
+            self.assertEqual(category_stats.reconcile(), 400)
+
+        self.assertLessEqual(max(bound), 999)
+        category.refresh_from_db()
+        self.assertEqual((category.page_count, category.total_page_views), (1, 4))
+        self.assertEqual(Category.objects.filter(page_count=0).count(), 399)
@@ -0,0 +1,104 @@
+import json
+import os
+import tempfile
+from unittest import mock
+
+from django.test import TestCase
+
+from rango import counters
+from rango.models import Category, Page
+
+
+class CounterTestCase(TestCase):
+
+    def setUp(self):
+        # A buffer of our own whose flush thread never wakes up on its own
+        self.buffer = counters.CounterBuffer(shards=4, flush_interval=3600,
+                                             flush_threshold=10 ** 6)
+        self.category = Category.objects.create(name='Python', likes=1)
+        self.page = Page.objects.create(category=self.category, title='Docs',
+                                        url='https://docs.python.org/', views=2)
+
+
+class CounterBufferTests(CounterTestCase):
+
+    def test_flush_writes_increments_and_rollups(self):
+        for _ in range(3):
+            self.buffer.incr(Page, self.page.pk)
+        self.buffer.incr(Category, self.category.pk, 'likes', 4)
+        self.assertEqual(self.buffer.pending_for(Page, self.page.pk), 3)
+
+        updates = self.buffer.flush()
+
+        self.assertEqual(updates, {('rango.Page', 'views'): {self.page.pk: 3},
+                                   ('rango.Category', 'likes'): {self.category.pk: 4}})
+        self.assertEqual(self.buffer.pending(), {})
+        self.page.refresh_from_db()
+        self.category.refresh_from_db()
+        self.assertEqual(self.page.views, 5)
+        self.assertEqual((self.category.likes, self.category.total_page_views), (5, 5))
+
+    def test_failed_write_keeps_counts(self):
+        self.buffer.incr(Page, self.page.pk, amount=3)
+        with mock.patch('rango.counters.write_updates', side_effect=RuntimeError):
+            with self.assertRaises(RuntimeError):
+                self.buffer.flush()
+
+        self.assertEqual(self.buffer.pending_for(Page, self.page.pk), 3)
+        self.page.refresh_from_db()
+        self.assertEqual(self.page.views, 2)
+
+    def test_signal_after_commit_survives_failing_receiver(self):
+        received = []
+
+        def failing(sender, updates, **kwargs):
+            raise RuntimeError('receiver bug')
+
+        def recording(sender, updates, **kwargs):
+            received.append(updates)
+
+        counters.counters_flushed.connect(failing)
+        counters.counters_flushed.connect(recording)
+        self.addCleanup(counters.counters_flushed.disconnect, failing)
+        self.addCleanup(counters.counters_flushed.disconnect, recording)
+
+        self.buffer.incr(Page, self.page.pk)
+        with self.assertLogs('rango.counters', 'ERROR'):
+            with self.captureOnCommitCallbacks(execute=True):
+                self.buffer.flush()
+                # Nothing is sent before the transaction commits
+                self.assertEqual(received, [])
+
+        self.assertEqual(received[0][('rango.Page', 'views')], {self.page.pk: 1})
+        self.assertEqual(self.buffer.pending(), {})
+
+
+class SpoolTests(CounterTestCase):
+
+    def setUp(self):
+        super().setUp()
+        spool_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(spool_dir.cleanup)
+        patcher = mock.patch('rango.counters.SPOOL_DIR', spool_dir.name)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_spool_and_replay(self):
+        self.buffer.incr(Page, self.page.pk, amount=6)
+        path = self.buffer.spool()
+
+        self.assertEqual(self.buffer.pending(), {})
+        with open(path) as f:
+            self.assertEqual(json.load(f), [['rango.Page', 'views', self.page.pk, 6]])
+
+        self.assertEqual(counters.replay_spool(), 1)
+        self.assertFalse(os.path.exists(path))
+        self.page.refresh_from_db()
+        self.category.refresh_from_db()
+        self.assertEqual((self.page.views, self.category.total_page_views), (8, 8))
+
+        # Replayed files are gone, a second run writes nothing
+        self.assertEqual(counters.replay_spool(), 0)
+
+    def test_nothing_to_spool(self):
+        self.assertIsNone(self.buffer.spool())
@@ -0,0 +1,16 @@
+from django.conf import settings
+from django.db import connections
+from django.test import TestCase
+
+
+class TuneConnectionTests(TestCase):
+    databases = {'default', 'replica'}
+
+    def test_busy_timeout_follows_options(self):
+        for alias in ('default', 'replica'):
+            options = settings.DATABASES[alias].get('OPTIONS', {})
+            if connections[alias].vendor != 'sqlite' or 'timeout' not in options:
+                continue
+            with connections[alias].cursor() as cursor:
+                cursor.execute('PRAGMA busy_timeout')
+                self.assertEqual(cursor.fetchone()[0], options['timeout'] * 1000)
@@ -0,0 +1,52 @@
+from django.test import TestCase
+
+from rango import caching, leaderboard
+from rango.models import Category
+
+
+class LeaderboardTests(TestCase):
+
+    def setUp(self):
+        caching.get_cache().clear()
+        self.categories = {}
+        for name, likes in (('A', 5), ('B', 9), ('C', 5), ('D', 1), ('E', 0)):
+            self.categories[name] = Category.objects.create(name=name, likes=likes)
+        # Tracks the best four rows, E stays outside
+        self.board = leaderboard.Leaderboard(Category, 'likes', ('id', 'name', 'likes'),
+                                             size=3, slack=1)
+
+    def row(self, name, likes):
+        return {'id': self.categories[name].pk, 'name': name, 'likes': likes}
+
+    def names(self):
+        return [row['name'] for row in self.board.top()]
+
+    def test_orders_by_score_then_pk(self):
+        self.assertEqual(self.names(), ['B', 'A', 'C'])
+
+    def test_update_reorders_in_memory(self):
+        self.board.top()
+        with self.assertNumQueries(0):
+            self.board.update([self.row('D', 7)])
+            self.assertEqual(self.names(), ['B', 'D', 'A'])
+
+    def test_remove(self):
+        self.board.top()
+        with self.assertNumQueries(0):
+            self.board.remove(self.categories['B'].pk)
+            self.assertEqual(self.names(), ['A', 'C', 'D'])
+
+    def test_rebuilds_when_an_untracked_row_could_rank(self):
+        self.board.top()
+        Category.objects.filter(name__in=['A', 'B', 'C']).update(likes=0)
+        self.board.update([self.row('A', 0), self.row('B', 0), self.row('C', 0)])
+
+        # The last of the top N now scores below what E might have
+        with self.assertNumQueries(1):
+            self.assertEqual(self.names(), ['D', 'A', 'B'])
+
+    def test_version_bump_rebuilds(self):
+        self.board.top()
+        Category.objects.filter(name='E').update(likes=100)
+        caching.bump_version('leaderboards')
+        self.assertEqual(self.names(), ['E', 'B', 'A'])
@@ -0,0 +1,94 @@
+import socket
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from django.test import SimpleTestCase
+
+from rango import linkcheck
+
+
+class StubHandler(BaseHTTPRequestHandler):
+    # /ok answers 200, /no-head refuses HEAD but answers GET, anything else 404
+
+    def answer(self):
+        self.server.requests.append((self.command, self.path, self.headers['Host']))
+        if self.path == '/ok' or (self.path == '/no-head' and self.command == 'GET'):
+            status = 200
+        elif self.path == '/no-head':
+            status = 405
+        else:
+            status = 404
+        self.send_response(status)
+        self.send_header('Content-Length', '0')
+        self.end_headers()
+
+    do_GET = do_HEAD = answer
+
+    def log_message(self, *args):
+        pass
+
+
+class LinkCheckerTests(SimpleTestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.server = ThreadingHTTPServer(('127.0.0.1', 0), StubHandler)
+        cls.server.requests = []
+        cls.port = cls.server.server_address[1]
+        threading.Thread(target=cls.server.serve_forever, daemon=True).start()
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.server.shutdown()
+        cls.server.server_close()
+        super().tearDownClass()
+
+    def setUp(self):
+        self.server.requests.clear()
+
+    def url(self, path, netloc=None):
+        return f'http://{netloc or f"127.0.0.1:{self.port}"}{path}'
+
+    def check(self, *urls):
+        return linkcheck.check_urls(list(urls), timeout=5)
+
+    def test_status(self):
+        results = self.check(self.url('/ok'), self.url('/missing'))
+
+        ok, missing = results[self.url('/ok')], results[self.url('/missing')]
+        self.assertEqual(ok.status, 200)
+        self.assertFalse(ok.is_dead)
+        self.assertIsNotNone(ok.latency_ms)
+        self.assertEqual(missing.status, 404)
+        self.assertTrue(missing.is_dead)
+
+    def test_falls_back_to_get(self):
+        result = self.check(self.url('/no-head'))[self.url('/no-head')]
+
+        self.assertEqual(result.status, 200)
+        self.assertEqual([method for method, _, _ in self.server.requests], ['HEAD', 'GET'])
+
+    def test_refused_connection(self):
+        # A port nothing listens on any more
+        with socket.socket() as sock:
+            sock.bind(('127.0.0.1', 0))
+            port = sock.getsockname()[1]
+        url = f'http://127.0.0.1:{port}/'
+
+        result = self.check(url)[url]
+        self.assertIsNone(result.status)
+        self.assertTrue(result.is_dead)
+        self.assertIn('ConnectionRefusedError', result.error)
+
+    def test_url_without_host(self):
+        for url in ('http:///ok', 'mailto:someone@example.com'):
+            result = self.check(url)[url]
+            self.assertTrue(result.is_dead)
+            self.assertIn('ValueError', result.error)
+        self.assertEqual(self.server.requests, [])
+
+    def test_host_header_leaves_out_credentials(self):
+        url = self.url('/ok', netloc=f'user:secret@127.0.0.1:{self.port}')
+        self.assertEqual(self.check(url)[url].status, 200)
+        self.assertEqual(self.server.requests[0][2], f'127.0.0.1:{self.port}')
@@ -0,0 +1,40 @@
+from django.core.management import CommandError, call_command
+from django.db import connection
+from django.test import TestCase
+
+from rango import loader
+from rango.models import Category, Page
+
+
+class LoaderTests(TestCase):
+
+    def rows(self, views):
+        # A full chunk of categories, then a full chunk of pages with one
+        # category each, the most the (category, title) lookup can bind
+        names = [f'Category {n}' for n in range(loader.MAX_CHUNK_SIZE)]
+        for name in names:
+            yield {'kind': 'category', 'category': name, 'views': 0, 'likes': 0}
+        for n, name in enumerate(names):
+            yield {'kind': 'page', 'category': name, 'title': f'Page {n}',
+                   'url': f'https://example.com/{n}', 'views': views}
+
+    def test_reload_stays_under_sqlite_parameter_limit(self):
+        loader.load_rows(self.rows(views=1), rebuild_search=False)
+
+        bound = []
+
+        def record(execute, sql, params, many, context):
+            if not many:
+                bound.append(len(params or ()))
+            return execute(sql, params, many, context)
+
+        with connection.execute_wrapper(record):
+            loader.Loader().load(self.rows(views=3))
+
+        self.assertLessEqual(max(bound), 999)
+        self.assertEqual(Category.objects.count(), loader.MAX_CHUNK_SIZE)
+        self.assertEqual(Page.objects.filter(views=3).count(), loader.MAX_CHUNK_SIZE)
+
+    def test_command_refuses_chunks_over_the_limit(self):
+        with self.assertRaises(CommandError):
+            call_command('load_rango', 'rows.jsonl', chunk_size=loader.MAX_CHUNK_SIZE + 1)
@@ -0,0 +1,61 @@
+from django.db.models import F
+from django.test import TestCase
+
+from rango import category_stats, counters
+from rango.models import Category, Page
+
+
+class CategorySaveTests(TestCase):
+
+    def test_stale_instance_keeps_flushed_counts(self):
+        category = Category.objects.create(name='Python', views=128, likes=65)
+        stale = Category.objects.get(pk=category.pk)
+
+        # What a counter flush does while the instance sits in an admin form
+        Category.objects.filter(pk=category.pk).update(likes=F('likes') + 10,
+                                                       views=F('views') + 5)
+        stale.name = 'Python 3'
+        stale.save()
+
+        category.refresh_from_db()
+        self.assertEqual(category.name, 'Python 3')
+        self.assertEqual(category.slug, 'python-3')
+        self.assertEqual((category.likes, category.views), (75, 133))
+
+    def test_update_fields_still_writes_counts(self):
+        category = Category.objects.create(name='Django', likes=32)
+        category.likes = 0
+        category.save(update_fields=['likes'])
+
+        category.refresh_from_db()
+        self.assertEqual(category.likes, 0)
+
+
+class PageDeleteTests(TestCase):
+
+    def test_stale_instance_subtracts_stored_views(self):
+        category = Category.objects.create(name='Python')
+        page = Page.objects.create(category=category, title='Docs',
+                                   url='https://docs.python.org/', views=7)
+        Page.objects.create(category=category, title='Tutorial',
+                            url='https://docs.python.org/tutorial/', views=6)
+        stale = Page.objects.get(pk=page.pk)
+
+        # A counter flush adds to the page and, rolled up, to its category
+        counters.write_updates({('rango.Page', 'views'): {page.pk: 7}})
+        stale.delete()
+
+        category.refresh_from_db()
+        self.assertEqual((category.page_count, category.total_page_views), (1, 6))
+        self.assertEqual(category_stats.compute()[category.pk], (1, 6))
+
+    def test_queryset_delete(self):
+        category = Category.objects.create(name='Django')
+        for n in range(3):
+            Page.objects.create(category=category, title=f'Page {n}',
+                                url=f'https://example.com/{n}', views=n)
+
+        Page.objects.filter(views__gt=0).delete()
+
+        category.refresh_from_db()
+        self.assertEqual((category.page_count, category.total_page_views), (1, 0))
@@ -0,0 +1,85 @@
+from unittest import mock
+
+from django.core.cache import caches
+from django.test import TestCase
+
+from rango import caching, throttle
+
+
+class ThrottleTestCase(TestCase):
+
+    def setUp(self):
+        # LocMemCache outlives a test, start every one with no counts
+        caches[throttle.CACHE_ALIAS].clear()
+        caches[caching.CACHE_ALIAS].clear()
+
+
+class SlidingWindowLimiterTests(ThrottleTestCase):
+
+    def test_limit(self):
+        limiter = throttle.SlidingWindowLimiter('test', 3, 60)
+        for _ in range(2):
+            limiter.hit('a')
+        self.assertFalse(limiter.is_limited('a'))
+
+        limiter.hit('a')
+        self.assertTrue(limiter.is_limited('a'))
+        self.assertFalse(limiter.is_limited('b'))
+
+        limiter.reset('a')
+        self.assertFalse(limiter.is_limited('a'))
+
+    def test_previous_window_fades_out(self):
+        limiter = throttle.SlidingWindowLimiter('test', 3, 60)
+        with mock.patch('rango.throttle.time') as clock:
+            # 40 seconds into a window
+            clock.time.return_value = 6040
+            for _ in range(3):
+                limiter.hit('a')
+            self.assertEqual(limiter.count('a'), 3)
+
+            # 40 seconds into the next one, a third of the old window is left
+            clock.time.return_value = 6100
+            self.assertAlmostEqual(limiter.count('a'), 1)
+            self.assertFalse(limiter.is_limited('a'))
+
+            clock.time.return_value = 6160
+            self.assertEqual(limiter.count('a'), 0)
+
+
+class LoginGuardTests(ThrottleTestCase):
+
+    def test_username_limit_is_per_ip(self):
+        guard = throttle.LoginGuard(ip_limit=20, username_limit=5)
+        for _ in range(5):
+            self.assertTrue(guard.allow('10.0.0.1', 'bob'))
+            guard.failed('10.0.0.1', 'bob')
+
+        self.assertFalse(guard.allow('10.0.0.1', 'Bob'))
+        self.assertTrue(guard.allow('10.0.0.1', 'alice'))
+        self.assertTrue(guard.allow('10.0.0.2', 'bob'))
+
+    def test_ip_limit(self):
+        guard = throttle.LoginGuard(ip_limit=3, username_limit=5)
+        for username in ('a', 'b', 'c'):
+            guard.failed('10.0.0.1', username)
+        self.assertFalse(guard.allow('10.0.0.1', 'd'))
+
+    def test_success_clears_username_count(self):
+        guard = throttle.LoginGuard(ip_limit=20, username_limit=2)
+        guard.failed('10.0.0.1', 'bob')
+        guard.failed('10.0.0.1', 'bob')
+        guard.succeeded('10.0.0.1', 'bob')
+        self.assertTrue(guard.allow('10.0.0.1', 'bob'))
+
+    def test_missing_slugs_do_not_evict_counts(self):
+        guard = throttle.LoginGuard(ip_limit=5, username_limit=5)
+        for _ in range(5):
+            guard.failed('10.0.0.1', 'bob')
+
+        # More missing slugs than the default cache holds
+        for n in range(1200):
+            caching.resolve_category(f'nope-{n}')
+
+        self.assertEqual(guard.by_ip.count('10.0.0.1'), 5)
+        self.assertFalse(guard.allow('10.0.0.1', 'bob'))
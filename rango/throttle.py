@@ -0,0 +1,135 @@
+import hashlib
+import threading
+import time
+
+from django.conf import settings
+from django.core import checks
+from django.core.cache import caches
+
+# The cache the counters live in, one of their own. In a cache other code
+# fills, e.g. with the missing slugs anyone can ask for, the LRU evicts the
+# counters and every lockout ends early. Point it at a cache every worker
+# shares (memcached, redis) so an attacker cannot spread attempts over workers.
+CACHE_ALIAS = getattr(settings, 'RANGO_THROTTLE_CACHE_ALIAS', 'throttle')
+
+# Failed logins allowed per client IP, and per username from one client IP,
+# within LOGIN_WINDOW seconds. Further attempts are refused before any
+# password is hashed. The username limit is per IP so that nobody can lock
+# the owner of an account out by failing logins against it from elsewhere.
+LOGIN_WINDOW = getattr(settings, 'RANGO_LOGIN_WINDOW', 300)
+LOGIN_IP_LIMIT = getattr(settings, 'RANGO_LOGIN_IP_LIMIT', 20)
+LOGIN_USERNAME_LIMIT = getattr(settings, 'RANGO_LOGIN_USERNAME_LIMIT', 5)
+
+
+class SlidingWindowLimiter:
+    # Counts events per identifier in fixed windows of `window` seconds and
+    # weighs the previous window by how much of it the sliding window still
+    # covers. That is two cache keys per identifier however busy it gets.
+
+    def __init__(self, name, limit, window, cache_alias=CACHE_ALIAS):
+        self.name = name
+        self.limit = limit
+        self.window = window
+        self.cache_alias = cache_alias
+
+    @property
+    def cache(self):
+        return caches[self.cache_alias]
+
+    def _keys(self, ident, now):
+        # Hashed, so any username makes a valid cache key
+        digest = hashlib.sha1(str(ident).encode('utf-8')).hexdigest()
+        index = int(now // self.window)
+        base = f'rango:throttle:{self.name}:{digest}'
+        return f'{base}:{index}', f'{base}:{index - 1}', (now % self.window) / self.window
+
+    def count(self, ident):
+        current, previous, elapsed = self._keys(ident, time.time())
+        counts = self.cache.get_many([current, previous])
+        return counts.get(current, 0) + counts.get(previous, 0) * (1 - elapsed)
+
+    def is_limited(self, ident):
+        return self.count(ident) >= self.limit
+
+    def hit(self, ident):
+        current, _, _ = self._keys(ident, time.time())
+        # add() followed by incr() is atomic on memcached and redis, and
+        # LocMemCache does both under its lock
+        if not self.cache.add(current, 1, timeout=self.window * 2):
+            try:
+                self.cache.incr(current)
+            except ValueError:
+                # Expired between the two calls
+                self.cache.set(current, 1, timeout=self.window * 2)
+
+    def reset(self, ident):
+        current, previous, _ = self._keys(ident, time.time())
+        self.cache.delete_many([current, previous])
+
+
+class LoginGuard:
+
+    def __init__(self, window=LOGIN_WINDOW, ip_limit=LOGIN_IP_LIMIT,
+                 username_limit=LOGIN_USERNAME_LIMIT):
+        self.by_ip = SlidingWindowLimiter('login-ip', ip_limit, window)
+        self.by_username = SlidingWindowLimiter('login-ip-user', username_limit, window)
+        self._lock = threading.Lock()
+        self._stats = {'allowed': 0, 'throttled': 0, 'failed': 0, 'succeeded': 0}
+
+    @staticmethod
+    def _username(ip, username):
+        return f'{ip}:{(username or "").strip().lower()}'
+
+    def _count(self, name):
+        with self._lock:
+            self._stats[name] += 1
+
+    def allow(self, ip, username):
+        # Two cache reads, much cheaper than the PBKDF2 run authenticate()
+        # would otherwise do, even for usernames that don't exist
+        if self.by_ip.is_limited(ip) or self.by_username.is_limited(self._username(ip, username)):
+            self._count('throttled')
+            return False
+        self._count('allowed')
+        return True
+
+    def failed(self, ip, username):
+        self._count('failed')
+        self.by_ip.hit(ip)
+        self.by_username.hit(self._username(ip, username))
+
+    def succeeded(self, ip, username):
+        # The owner got in, earlier typos no longer count against them
+        self._count('succeeded')
+        self.by_username.reset(self._username(ip, username))
+
+    def metrics(self):
+        with self._lock:
+            return dict(self._stats)
+
+
+@checks.register(checks.Tags.caches)
+def check_cache_alias(app_configs, **kwargs):
+    # Say so at startup when the counters have no cache of their own
+    from rango import caching
+
+    if CACHE_ALIAS not in settings.CACHES:
+        return [checks.Error(f'RANGO_THROTTLE_CACHE_ALIAS is {CACHE_ALIAS!r}, '
+                             'which is not in CACHES.',
+                             hint="Add a 'throttle' cache that nothing else uses.",
+                             id='rango.E001')]
+    shared = {caching.CACHE_ALIAS, getattr(settings, 'SESSION_CACHE_ALIAS', 'default')}
+    if CACHE_ALIAS in shared:
+        return [checks.Warning(f'Login throttling counts in the {CACHE_ALIAS!r} cache, '
+                               'which other entries can push the counters out of.',
+                               hint="Give RANGO_THROTTLE_CACHE_ALIAS a cache of its own.",
+                               id='rango.W001')]
+    return []
+
+
+def client_ip(request):
+    # REMOTE_ADDR only, a proxy's X-Forwarded-For can be set by anyone
+    return request.META.get('REMOTE_ADDR', '')
+
+
+guard = LoginGuard()
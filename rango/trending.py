@@ -0,0 +1,196 @@
+import heapq
+import logging
+import threading
+import time
+from array import array
+
+from django.apps import apps
+from django.conf import settings
+
+logger = logging.getLogger(__name__)
+
+# Events are counted per bucket of BUCKET_SECONDS, and each object keeps the
+# last BUCKETS of them in a ring. The defaults cover two days by the hour.
+BUCKET_SECONDS = getattr(settings, 'RANGO_TRENDING_BUCKET_SECONDS', 60 * 60)
+BUCKETS = getattr(settings, 'RANGO_TRENDING_BUCKETS', 48)
+
+# A bucket counts half as much as the one HALF_LIFE seconds newer
+HALF_LIFE = getattr(settings, 'RANGO_TRENDING_HALF_LIFE', 6 * 60 * 60)
+
+# How many rows trending_categories()/trending_pages() return, and how often
+# the background thread works the scores out again (seconds)
+SIZE = getattr(settings, 'RANGO_TRENDING_SIZE', 5)
+REFRESH_INTERVAL = getattr(settings, 'RANGO_TRENDING_REFRESH_INTERVAL', 60)
+
+# What a counter increment is worth, per (model_label, field)
+WEIGHTS = {
+    ('rango.Category', 'views'): 1,
+    ('rango.Category', 'likes'): 5,
+    ('rango.Page', 'views'): 1,
+}
+
+# The fields the trending lists hand to templates, per model
+FIELDS = {
+    'rango.Category': ('id', 'name', 'slug'),
+    'rango.Page': ('id', 'title', 'url'),
+}
+
+
+class Series:
+    # One object's counts: a fixed array of BUCKETS slots used as a ring,
+    # slot = bucket number % BUCKETS, the newest bucket number written, and
+    # the decayed score as of that bucket. The score is kept up to date as
+    # counts arrive and buckets go by, it is never summed up again.
+
+    __slots__ = ('counts', 'newest', 'score', 'total')
+
+    def __init__(self, buckets, bucket):
+        self.counts = array('L', bytes(array('L').itemsize * buckets))
+        self.newest = bucket
+        self.score = 0.0
+        self.total = 0
+
+    def advance(self, bucket, decay, step):
+        # Move the newest bucket forward. Each bucket that goes by ages every
+        # count by one (score * step) and pushes the oldest slot out of the
+        # window, so its contribution is taken off and the slot cleared.
+        size = len(self.counts)
+        if bucket <= self.newest:
+            return
+
+        if bucket - self.newest >= size:
+            self.counts = array('L', bytes(self.counts.itemsize * size))
+            self.score = 0.0
+            self.total = 0
+        else:
+            for number in range(self.newest + 1, bucket + 1):
+                slot = number % size
+                self.score = (self.score - self.counts[slot] * decay[size - 1]) * step
+                self.total -= self.counts[slot]
+                self.counts[slot] = 0
+            if not self.total:
+                # Don't let float rounding leave a score behind
+                self.score = 0.0
+
+        self.newest = bucket
+
+    def add(self, bucket, amount, decay, step):
+        self.advance(bucket, decay, step)
+        age = self.newest - bucket
+        if age < len(self.counts):
+            self.counts[bucket % len(self.counts)] += amount
+            self.total += amount
+            self.score += amount * decay[age]
+
+
+class Trending:
+
+    def __init__(self, bucket_seconds=BUCKET_SECONDS, buckets=BUCKETS, half_life=HALF_LIFE,
+                 size=SIZE, refresh_interval=REFRESH_INTERVAL):
+        self.bucket_seconds = bucket_seconds
+        self.buckets = buckets
+        self.size = size
+        self.refresh_interval = refresh_interval
+
+        # decay[age] is the weight of a bucket `age` buckets old, and a
+        # bucket going by multiplies every weight by step
+        self.step = 0.5 ** (bucket_seconds / half_life)
+        self.decay = [self.step ** age for age in range(buckets)]
+
+        self._lock = threading.Lock()
+        # model_label -> {pk: Series}
+        self._series = {label: {} for label in FIELDS}
+        # model_label -> published rows, replaced whole by refresh()
+        self._top = {label: [] for label in FIELDS}
+        self._thread = None
+
+    def _bucket(self, now=None):
+        return int((time.time() if now is None else now) // self.bucket_seconds)
+
+    def record(self, label, field, deltas, now=None):
+        # deltas = {pk: amount}, as counters_flushed sends them. O(1) per
+        # object, plus one step per bucket gone by since its last event.
+        weight = WEIGHTS.get((label, field))
+        if weight is None:
+            return
+
+        bucket = self._bucket(now)
+        with self._lock:
+            series = self._series[label]
+            for pk, amount in deltas.items():
+                if pk not in series:
+                    series[pk] = Series(self.buckets, bucket)
+                series[pk].add(bucket, amount * weight, self.decay, self.step)
+
+        self._ensure_thread()
+
+    def scores(self, label, now=None):
+        # Bring every series up to the current bucket and read its score.
+        # Objects whose events all left the window are forgotten. Within a
+        # bucket this is a dict read per object, and the ranking happens
+        # outside the lock.
+        bucket = self._bucket(now)
+        scores = {}
+        with self._lock:
+            series = self._series[label]
+            for pk in list(series):
+                item = series[pk]
+                item.advance(bucket, self.decay, self.step)
+                if item.total:
+                    scores[pk] = item.score
+                else:
+                    del series[pk]
+        return scores
+
+    def refresh(self, now=None):
+        # Rank the scores and publish the best `size` rows of each model.
+        # Runs in the background thread, requests only read _top.
+        for label, fields in FIELDS.items():
+            scores = self.scores(label, now)
+            best = heapq.nlargest(self.size, scores.items(), key=lambda item: (item[1], -item[0]))
+
+            model = apps.get_model(label)
+            rows = {row['id']: row for row in
+                    model.objects.filter(pk__in=[pk for pk, _ in best]).values(*fields)}
+            # Deleted objects drop out here
+            self._top[label] = [dict(rows[pk], score=round(score, 2))
+                                for pk, score in best if pk in rows]
+
+    def top(self, label):
+        self._ensure_thread()
+        return self._top[label]
+
+    def _ensure_thread(self):
+        if self._thread is not None:
+            return
+
+        with self._lock:
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name='rango-trending',
+                                                daemon=True)
+                self._thread.start()
+
+    def _run(self):
+        while True:
+            time.sleep(self.refresh_interval)
+            try:
+                self.refresh()
+            except Exception:
+                logger.exception('Could not refresh the trending lists')
+
+
+engine = Trending()
+
+
+def record(updates):
+    # updates = {(model_label, field): {pk: delta}}, see rango.counters
+    for (label, field), deltas in updates.items():
+        engine.record(label, field, deltas)
+
+
+def trending_categories():
+    return engine.top('rango.Category')
+
+
+def trending_pages():
+    return engine.top('rango.Page')
@@ -1,5 +1,6 @@
 from django.urls import path
 from rango import views
+from rango import async_views
 
 app_name = 'rango'
 
@@ -9,9 +10,18 @@ urlpatterns = [
     path('category/<slug:category_name_slug>/', views.show_category, name='show_category'),
     path('add_category/', views.add_category, name='add_category'),
     path('category/<slug:category_name_slug>/add_page/', views.add_page, name='add_page'),
+    path('category/<slug:category_name_slug>/like/', views.like_category, name='like_category'),
     path('register/', views.register, name='register'),
     path('login/', views.user_login, name='login'),
     path('restricted/', views.restricted, name='restricted'),
-    path('logout/', views.user_logout, name='logout')
+    path('logout/', views.user_logout, name='logout'),
+    path('goto/', views.goto_url, name='goto'),
+    path('search/', views.search, name='search'),
+    path('export/<str:kind>/', views.export_catalogue, name='export'),
+    path('stats/', views.stats, name='stats'),
+    path('async/', async_views.index, name='async_index'),
+    path('async/about/', async_views.about, name='async_about'),
+    path('async/category/<slug:category_name_slug>/', async_views.show_category,
+         name='async_show_category'),
 ]
 
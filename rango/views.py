@@ -2,69 +2,136 @@
 from django.shortcuts import render
 from django.shortcuts import redirect
 from django.http import HttpResponse
+from django.http import Http404, StreamingHttpResponse, JsonResponse
 from django.urls import reverse
 from django.contrib.auth import login, authenticate, logout
 from django.contrib.auth.decorators import login_required
+from django.contrib.admin.views.decorators import staff_member_required
+from django.views.decorators.http import require_POST
+from django.db import IntegrityError, transaction
 
 from rango.models import Category
 from rango.models import Page
+from rango.models import CategoryLike
+
+from rango import caching
+from rango import counters
+from rango import clicks
+from rango import leaderboard
+from rango import trending
+from rango import search_index
+from rango import export
+from rango import middleware
+from rango import visitors
+from rango import response_cache
+from rango import images
+from rango import linkcheck
+from rango import throttle
+from rango import hashers
+from rango.pagination import keyset_page, decode_cursor
 
 from rango.forms import CategoryForm
 from rango.forms import PageForm
 from rango.forms import UserForm, UserProfileForm
 
-from datetime import datetime
 
+# Version stamps the index page depends on, the lists are part of its key
+INDEX_VERSIONS = ['categories']
 
-def index(request):
-
-    category_list = Category.objects.order_by('-likes')[:5]
-    page_list = Page.objects.order_by('-views')[:5]
 
+def index_context():
+    # The top five lists are kept up to date by rango.leaderboard and
+    # rango.trending, so no sorting happens here
     context_dict = {}
     context_dict['boldmessage'] = 'Crunchy, creamy, cookie, candy, cupcake!'
-    context_dict['categories'] = category_list
-    context_dict['pages'] = page_list
+    context_dict['categories'] = leaderboard.top_categories()
+    context_dict['pages'] = leaderboard.top_pages()
+    context_dict['trending_categories'] = trending.trending_categories()
+    context_dict['trending_pages'] = trending.trending_pages()
+    return context_dict
 
-    visitor_cookie_handler(request)
-    response = render(request, 'rango/index.html', context=context_dict)
-    return response
+
+def index_cache_key(context_dict):
+    # The page only changes when the lists or the sidebar do
+    return 'index:{}:{}:{}:{}'.format(
+        [(c['id'], c['name'], c['slug']) for c in context_dict['categories']],
+        [(p['id'], p['title']) for p in context_dict['pages']],
+        [c['id'] for c in context_dict['trending_categories']],
+        [p['id'] for p in context_dict['trending_pages']])
+
+
+def index(request):
+    # Shared with the async index in rango/async_views.py
+    context_dict = index_context()
+
+    def build():
+        return render(request, 'rango/index.html', context=context_dict)
+
+    visitors.track_visit(request)
+    response = response_cache.cached_anonymous(request, index_cache_key(context_dict),
+                                               INDEX_VERSIONS, build)
+    return visitors.save_visit(request, response)
 
 
 def about(request):
     
-    context_dict = {}
-    visitor_cookie_handler(request)
-    context_dict['visits'] = request.session['visits']
-    return render(request, 'rango/about.html', context=context_dict)
+    visits = visitors.track_visit(request)
+
+    def build():
+        context_dict = {}
+        context_dict['visits'] = visits
+        return render(request, 'rango/about.html', context=context_dict)
+
+    # The visit count is part of the page, so it is part of the key
+    response = response_cache.cached_anonymous(request, f'about:{visits}', ['categories'], build)
+    return visitors.save_visit(request, response)
 
 
 def show_category(request, category_name_slug):
     # Create a context dictionary which we can pass to the template rendering engine
     context_dict = {}
 
-    try:
-        # get the category name slug, if cannot get, raise a DoesNotExist exception
-        category = Category.objects.get(slug=category_name_slug)
+    # look the slug up in the slug cache, None means there is no such category.
+    # Usually this costs no query at all, even for slugs that don't exist.
+    category = caching.resolve_category(category_name_slug)
+
+    if category is None:
 
-        # Retrieve all of the associated pages
-        # The filter() will return a list of page objects or an empty list
-        pages = Page.objects.filter(category=category)
+        # We get here if we didn't find the specified category
+        context_dict['category'] = None
+        context_dict['pages'] = None
+        return render(request, 'rango/category.html', context=context_dict)
+
+    # count the visit, the counter buffer writes it out in the background
+    counters.incr(Category, category['id'])
+
+    # Junk and tampered cursors decode to None, the first screen, so they
+    # share its cache entry instead of each filling a new one
+    cursor = decode_cursor(request.GET.get('after', ''))
+
+    def build():
+        # Retrieve one screen of the associated pages, continuing after the
+        # cursor in the URL if there is one. Only the fields the template uses
+        # are loaded. This is the only query the page needs.
+        pages = (Page.objects.filter(category_id=category['id'])
+                 .select_related('link_status')
+                 .only('id', 'title', 'views', 'link_status__is_dead'))
+        pages = linkcheck.hide_dead(pages)
+        pages, next_cursor = keyset_page(pages, cursor)
 
         # add page list into context dictionary 'pages'
         context_dict['pages'] = pages
+        context_dict['next_cursor'] = next_cursor
 
         # add cateogry list into context dictionary 'category'
         context_dict['category'] = category
 
-    except Category.DoesNotExist:
+        # Render everything together
+        return render(request, 'rango/category.html', context=context_dict)
 
-        # We get here if we didn't find the specified category
-        context_dict['category'] = None
-        context_dict['pages'] = None
-
-    # Render everything together
-    return render(request, 'rango/category.html', context=context_dict)
+    key = f'show_category:{category["id"]}:{cursor}'
+    versions = ['categories', response_cache.category_version(category['id'])]
+    return response_cache.cached_anonymous(request, key, versions, build)
 
 
 @login_required
@@ -89,11 +156,38 @@ def add_category(request):
 
 
 @login_required
-def add_page(request, category_name_slug):
+@require_POST
+def like_category(request, category_name_slug):
+    category = caching.resolve_category(category_name_slug)
+    if category is None:
+        raise Http404('Unknown category')
+    category_id, likes = category['id'], category['likes']
+
+    # The unique constraint on (user, category) decides whether this is a
+    # new like, so two clicks racing each other still count once
     try:
-        category = Category.objects.get(slug=category_name_slug)
-    except Category.DoesNotExist:
-        category = None
+        with transaction.atomic():
+            CategoryLike.objects.create(user=request.user, category_id=category_id)
+        liked = True
+    except IntegrityError:
+        liked = False
+
+    # Likes go through the counter buffer, so a burst on one category
+    # becomes a single UPDATE ... SET likes = likes + n
+    if liked:
+        counters.incr(Category, category_id, 'likes')
+
+    if request.headers.get('x-requested-with') == 'XMLHttpRequest':
+        likes += counters.pending_for(Category, category_id, 'likes')
+        return JsonResponse({'liked': liked, 'likes': likes})
+
+    return redirect(reverse('rango:show_category',
+                            kwargs={'category_name_slug': category_name_slug}))
+
+
+@login_required
+def add_page(request, category_name_slug):
+    category = caching.resolve_category(category_name_slug)
 
     if category is None:
         return redirect(reverse('rango:index'))
@@ -106,9 +200,15 @@ def add_page(request, category_name_slug):
         if form.is_valid():
             if category:
                 page = form.save(commit=False)
-                page.category = category
+                page.category_id = category['id']
                 page.views = 0
-                page.save()
+                try:
+                    page.save()
+                except IntegrityError:
+                    # The slug cache of this worker still knew a category
+                    # another worker has deleted since
+                    caching.invalidate_slugs(category_name_slug)
+                    raise Http404('No such category.')
 
                 return redirect(reverse('rango:show_category',
                                         kwargs={'category_name_slug': category_name_slug}))
@@ -131,10 +231,23 @@ def register(request):
         # grab information form the raw form information
         # Note that we use both UserForm and UserProfileForm
         user_form = UserForm(request.POST)
-        profile_form = UserProfileForm(request.POST)
+        # With request.FILES the ImageField checks that the picture really is an image
+        profile_form = UserProfileForm(request.POST, request.FILES)
+
+        valid = user_form.is_valid() and profile_form.is_valid()
+        picture_name = None
+
+        if valid and profile_form.cleaned_data.get('picture'):
+            # The validated picture is streamed to disk under a content hash
+            # name, with the extension of the format PIL finds in it
+            try:
+                picture_name = images.save_upload(profile_form.cleaned_data['picture'])
+            except ValueError as e:
+                profile_form.add_error('picture', str(e))
+                valid = False
 
         # If the two forms are valid
-        if user_form.is_valid() and profile_form.is_valid():
+        if valid:
             # save the user's form data to the database
             user = user_form.save()
 
@@ -149,14 +262,16 @@ def register(request):
             profile = profile_form.save(commit=False)
             profile.user = user
 
-            # check whether the user provided a profile picture
-            # If so, get it from the input form and put it in UserProfile Model
-            if 'picture' in request.FILES:
-                profile.picture = request.FILES('picture')
+            # Point the profile at the saved file rather than the upload
+            profile.picture = picture_name or ''
 
             # Now we can save
             profile.save()
 
+            # The thumbnails are made in the background
+            if picture_name:
+                images.schedule_thumbnails(picture_name)
+
             # Update our variable to indicate that the template registration was successful
             registered = True
 
@@ -187,11 +302,20 @@ def user_login(request):
         # but request.POST['<varible>'] will return exception
         username = request.POST.get('username')
         password = request.POST.get('password')
+        ip = throttle.client_ip(request)
+
+        # Too many failures from this address or for this username: refuse
+        # before authenticate() spends a password hash on the attempt
+        if not throttle.guard.allow(ip, username):
+            response = HttpResponse("Too many login attempts, please try again later", status=429)
+            response['Retry-After'] = str(throttle.LOGIN_WINDOW)
+            return response
 
         # use authenticate method to check if the username/password combination is valid
         user = authenticate(username=username, password=password)
 
         if user:
+            throttle.guard.succeeded(ip, username)
             if user.is_active:
                 # log in successful
                 login(request, user)
@@ -202,7 +326,7 @@ def user_login(request):
 
         else:
             # wrong input, cannot log in!
-            print(f"Invalid login details: {username}, {password}")
+            throttle.guard.failed(ip, username)
             return HttpResponse("Invalid login details supplied")
 
     else:
@@ -210,41 +334,72 @@ def user_login(request):
         return render(request, 'rango/login.html')
 
 
-@login_required
-def restricted(request):
-    return render(request, 'rango/restricted.html')
-
-
-@login_required
-def user_logout(request):
-    logout(request)
-    return redirect(reverse('rango:index'))
+def goto_url(request):
+    # Look up where the page points, record the click and send the visitor on.
+    # The click is only queued here, the write happens in the background.
+    try:
+        page_id = int(request.GET.get('page_id'))
+        url = Page.objects.values_list('url', flat=True).get(pk=page_id)
+    except (TypeError, ValueError, Page.DoesNotExist):
+        return redirect(reverse('rango:index'))
 
+    clicks.record(page_id)
+    return redirect(url)
 
-def get_server_side_cookie(request, cookie, default_val=None):
-    val = request.session.get(cookie)
-    if not val:
-        val = default_val
-    return val
 
+def search(request):
+    query = request.GET.get('query', '').strip()
 
-def visitor_cookie_handler(request):
+    # page numbers come from the URL, so anything odd just means page one
+    try:
+        page_number = max(int(request.GET.get('page', 1)), 1)
+    except ValueError:
+        page_number = 1
+
+    results, has_next = search_index.search(query, page_number)
+
+    context_dict = {'query': query,
+                    'results': results,
+                    'page_number': page_number,
+                    'has_next': has_next}
+    return render(request, 'rango/search.html', context=context_dict)
+
+
+@staff_member_required
+def export_catalogue(request, kind):
+    # e.g. /rango/export/pages/?format=jsonl&category=python&gzip=1
+    file_format = request.GET.get('format', 'csv')
+    if kind not in export.FIELDS or file_format not in export.FORMATS:
+        raise Http404('Unknown export')
+
+    category_slug = request.GET.get('category') or None
+    gzip = request.GET.get('gzip') == '1'
+
+    # A compressed body is a .gz file, whatever format is inside it
+    content_type = 'application/gzip' if gzip else export.FORMATS[file_format]
+    response = StreamingHttpResponse(export.export(kind, file_format, category_slug, gzip),
+                                     content_type=content_type)
+    filename = export.filename(kind, file_format, category_slug, gzip)
+    response['Content-Disposition'] = f'attachment; filename="{filename}"'
+    return response
 
-    visits = int(get_server_side_cookie(request, 'visits', '1'))
 
-    last_visit_cookie = get_server_side_cookie(request, 'last_visit', str(datetime.now()))
-    last_visit_time = datetime.strptime(last_visit_cookie[:-7], '%Y-%m-%d %H:%M:%S')
+@staff_member_required
+def stats(request):
+    # Filled in by rango.middleware.QueryStatsMiddleware when it is enabled
+    return JsonResponse({'views': middleware.stats.snapshot(),
+                         'clicks': clicks.metrics(),
+                         'logins': throttle.guard.metrics(),
+                         'password_hashing': hashers.timings.snapshot()})
 
 
-    # If more than a day since the last visit
-    if(datetime.now() - last_visit_time).days > 0:
-        visits = visits + 1
+@login_required
+def restricted(request):
+    return render(request, 'rango/restricted.html')
 
-        # Update the last visit cookie now that we have update the count
-        request.session['last_visit'] = str(datetime.now())
 
-    else:
-        # set the last visit cookie
-        request.session['last_visit'] = last_visit_cookie
+@login_required
+def user_logout(request):
+    logout(request)
+    return redirect(reverse('rango:index'))
 
-    request.session['visits'] = visits
\ No newline at end of file
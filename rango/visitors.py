@@ -0,0 +1,96 @@
+import time
+from datetime import datetime
+
+from django.conf import settings
+
+# Where the visit counter lives:
+# 'session' keeps it in request.session, so in whatever SESSION_ENGINE uses
+# 'cookie' keeps it in a signed cookie, anonymous visitors then cost no
+#          session row and no database write at all
+STORE = getattr(settings, 'RANGO_VISITOR_STORE', 'session')
+
+SESSION_KEY = 'rango_visit'
+COOKIE_NAME = 'rango_visit'
+COOKIE_SALT = 'rango.visitors'
+COOKIE_MAX_AGE = 60 * 60 * 24 * 365
+
+# A visit counts once this many seconds have passed since the last counted one
+DAY = 60 * 60 * 24
+
+
+def _parse(value):
+    # Both stores hold "visits:last_visit" with last_visit in epoch seconds
+    try:
+        visits, last_visit = value.split(':')
+        return int(visits), int(last_visit)
+    except (AttributeError, ValueError):
+        return None
+
+
+def _read_legacy_session(request):
+    # Sessions written before this module kept a string datetime under
+    # 'last_visit' and the count under 'visits'
+    last_visit = request.session.get('last_visit')
+    if not last_visit:
+        return None
+
+    try:
+        last_visit = datetime.strptime(last_visit[:19], '%Y-%m-%d %H:%M:%S')
+        return int(request.session.get('visits', 1)), int(last_visit.timestamp())
+    except ValueError:
+        return None
+
+
+def _read(request):
+    if STORE == 'cookie':
+        return _parse(request.get_signed_cookie(COOKIE_NAME, default=None, salt=COOKIE_SALT))
+
+    # Only touch the session if the visitor already has one, so a first
+    # visit does not load (or later create) a session just to read nothing
+    if settings.SESSION_COOKIE_NAME not in request.COOKIES:
+        return None
+
+    visit = _parse(request.session.get(SESSION_KEY))
+    if visit is None:
+        visit = _read_legacy_session(request)
+        if visit is not None:
+            del request.session['last_visit']
+            request.session.pop('visits', None)
+            request._rango_visit_changed = True
+    return visit
+
+
+def track_visit(request):
+    # Returns the visit count, and only marks it for saving when it changed
+    now = int(time.time())
+    visit = _read(request)
+    changed = getattr(request, '_rango_visit_changed', False)
+
+    if visit is None:
+        visits, last_visit = 1, now
+        changed = True
+    else:
+        visits, last_visit = visit
+        if now - last_visit >= DAY:
+            visits += 1
+            last_visit = now
+            changed = True
+
+    request._rango_visit = (visits, last_visit)
+    request._rango_visit_changed = changed
+
+    if changed and STORE == 'session':
+        request.session[SESSION_KEY] = f'{visits}:{last_visit}'
+
+    return visits
+
+
+def save_visit(request, response):
+    # The cookie store needs the response to write to, call this after
+    # rendering. For the session store the middleware does the saving.
+    if STORE == 'cookie' and getattr(request, '_rango_visit_changed', False):
+        visits, last_visit = request._rango_visit
+        response.set_signed_cookie(COOKIE_NAME, f'{visits}:{last_visit}',
+                                   salt=COOKIE_SALT, max_age=COOKIE_MAX_AGE,
+                                   httponly=True, samesite='Lax')
+    return response
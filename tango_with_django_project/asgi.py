@@ -0,0 +1,23 @@
+"""
+ASGI config for tango_with_django_project project.
+
+It exposes the ASGI callable as a module-level variable named ``application``.
+Run it with an ASGI server, e.g.
+
+    uvicorn tango_with_django_project.asgi:application --workers 4
+
+The async views in rango/async_views.py are served under /rango/async/,
+every other view keeps running synchronously in a thread.
+"""
+
+import os
+
+from django.core.asgi import get_asgi_application
+
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'tango_with_django_project.settings')
+
+application = get_asgi_application()
+
+# Compile the rango templates now rather than on this worker's first requests
+from rango import templating  # noqa: E402
+templating.warm()
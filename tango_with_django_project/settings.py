@@ -42,10 +42,12 @@ INSTALLED_APPS = [
     'django.contrib.sessions',
     'django.contrib.messages',
     'django.contrib.staticfiles',
-    'rango',
+    'rango.apps.RangoConfig',
 ]
 
 MIDDLEWARE = [
+    # Uncomment to record per view query counts and timings, see rango:stats
+    # 'rango.middleware.QueryStatsMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
@@ -57,12 +59,24 @@ MIDDLEWARE = [
 
 ROOT_URLCONF = 'tango_with_django_project.urls'
 
+# Templates are looked up in DIRS, then in each app's templates folder.
+# Without DEBUG the cached loader keeps every compiled template in memory,
+# and wsgi.py/asgi.py compile templates/rango/ when a worker starts
+# (see rango/templating.py). APP_DIRS must be off when loaders are given.
+_template_loaders = [
+    'django.template.loaders.filesystem.Loader',
+    'django.template.loaders.app_directories.Loader',
+]
+if not DEBUG:
+    _template_loaders = [('django.template.loaders.cached.Loader', _template_loaders)]
+
 TEMPLATES = [
     {
         'BACKEND': 'django.template.backends.django.DjangoTemplates',
         'DIRS': [TEMPLATE_DIR, ],
-        'APP_DIRS': True,
+        'APP_DIRS': False,
         'OPTIONS': {
+            'loaders': _template_loaders,
             'context_processors': [
                 'django.template.context_processors.debug',
                 'django.template.context_processors.request',
@@ -75,18 +89,226 @@ TEMPLATES = [
 ]
 
 WSGI_APPLICATION = 'tango_with_django_project.wsgi.application'
+ASGI_APPLICATION = 'tango_with_django_project.asgi.application'
 
 
 # Database
 # https://docs.djangoproject.com/en/2.1/ref/settings/#databases
 
-DATABASES = {
-    'default': {
-        'ENGINE': 'django.db.backends.sqlite3',
-        'NAME': os.path.join(BASE_DIR, 'db.sqlite3'),
+# 'default' is the primary, every write goes there. Reads of rango models go
+# to 'replica' (see rango/routers.py), which for SQLite is a read-only
+# connection to the same file. Each new SQLite connection is tuned by
+# rango/db.py (WAL, synchronous=NORMAL, mmap_size, cache_size). OPTIONS
+# timeout is how many seconds a writer waits for the lock.
+# Set RANGO_DB_ENGINE=postgresql and the RANGO_DB_* variables below to run
+# against a Postgres primary/replica pair instead.
+
+DB_PATH = os.path.join(BASE_DIR, 'db.sqlite3')
+
+# Seconds a connection is kept open between requests
+CONN_MAX_AGE = int(os.environ.get('RANGO_CONN_MAX_AGE', 600))
+
+if os.environ.get('RANGO_DB_ENGINE') == 'postgresql':
+    _postgres = {
+        'ENGINE': 'django.db.backends.postgresql',
+        'NAME': os.environ.get('RANGO_DB_NAME', 'rango'),
+        'USER': os.environ.get('RANGO_DB_USER', 'rango'),
+        'PASSWORD': os.environ.get('RANGO_DB_PASSWORD', ''),
+        'PORT': os.environ.get('RANGO_DB_PORT', '5432'),
+        'CONN_MAX_AGE': CONN_MAX_AGE,
+        'CONN_HEALTH_CHECKS': True,
+    }
+    DATABASES = {
+        'default': dict(_postgres, HOST=os.environ.get('RANGO_DB_PRIMARY_HOST', 'localhost')),
+        'replica': dict(_postgres,
+                        HOST=os.environ.get('RANGO_DB_REPLICA_HOST', 'localhost'),
+                        TEST={'MIRROR': 'default'}),
     }
+else:
+    DATABASES = {
+        'default': {
+            'ENGINE': 'django.db.backends.sqlite3',
+            'NAME': DB_PATH,
+            'CONN_MAX_AGE': CONN_MAX_AGE,
+            'CONN_HEALTH_CHECKS': True,
+            'OPTIONS': {
+                'timeout': 20,
+            },
+        },
+        'replica': {
+            'ENGINE': 'django.db.backends.sqlite3',
+            'NAME': f'file:{DB_PATH}?mode=ro',
+            'CONN_MAX_AGE': CONN_MAX_AGE,
+            'CONN_HEALTH_CHECKS': True,
+            'OPTIONS': {
+                'uri': True,
+                'timeout': 20,
+            },
+            'TEST': {
+                'MIRROR': 'default',
+            },
+        },
+    }
+
+DATABASE_ROUTERS = ['rango.routers.PrimaryReplicaRouter']
+RANGO_READ_REPLICA = 'replica'
+RANGO_REPLICA_HEALTH_CHECK_INTERVAL = 30
+
+
+# Cache
+# LocMemCache evicts the least recently used entries once MAX_ENTRIES is hit,
+# and TIMEOUT bounds how long anything may live. It lives in one process:
+# with several workers an invalidation (a saved category, a renamed slug)
+# only reaches the worker that made it, the others serve their copy until it
+# times out, which is why the timeouts below are short. Set RANGO_REDIS_URL
+# to share the cache between workers and invalidate everywhere at once.
+# rango keeps the sidebar category list here (see rango/caching.py)
+
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION': 'rango',
+        'TIMEOUT': 60 * 15,
+        'OPTIONS': {
+            'MAX_ENTRIES': 1000,
+        },
+    },
+    # Shared by every worker on the machine, holds the sessions
+    # in front of the database (see rango/session_backend.py).
+    # FileBasedCache lists its whole directory on every set() to decide
+    # whether to cull, so each session write costs a scan of up to
+    # MAX_ENTRIES files. Keep it small: a culled session is simply read
+    # from the database again. With RANGO_REDIS_URL sessions go to redis.
+    'sessions': {
+        'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+        'LOCATION': os.path.join(BASE_DIR, 'cache', 'sessions'),
+        'TIMEOUT': 60 * 60 * 24 * 14,
+        'OPTIONS': {
+            'MAX_ENTRIES': 2000,
+        },
+    },
+    # Login throttling counters only (see rango/throttle.py). In a cache that
+    # anonymous requests also fill, e.g. with missing slugs, the LRU would
+    # evict the counters and lift every lockout.
+    'throttle': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION': 'rango-throttle',
+        'OPTIONS': {
+            'MAX_ENTRIES': 100000,
+        },
+    },
 }
 
+RANGO_REDIS_URL = os.environ.get('RANGO_REDIS_URL')
+if RANGO_REDIS_URL:
+    CACHES['default'] = {
+        'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+        'LOCATION': RANGO_REDIS_URL,
+        'TIMEOUT': 60 * 15,
+    }
+    CACHES['sessions'] = {
+        'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+        'LOCATION': RANGO_REDIS_URL,
+        'TIMEOUT': 60 * 60 * 24 * 14,
+        'KEY_PREFIX': 'sessions',
+    }
+    CACHES['throttle'] = {
+        'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+        'LOCATION': RANGO_REDIS_URL,
+        'KEY_PREFIX': 'throttle',
+    }
+
+RANGO_CACHE_ALIAS = 'default'
+
+# Sessions: an in-process LRU, then the 'sessions' cache, then the database.
+# Purge expired ones from the database with manage.py purge_sessions.
+# The LRU of one worker does not hear about changes made in another: after a
+# logout or a key change elsewhere, the old session stays usable in the other
+# workers for up to RANGO_SESSION_L1_TTL seconds. Set it to 0 to turn the
+# LRU off where that matters more than the saved cache reads.
+SESSION_ENGINE = 'rango.session_backend'
+SESSION_CACHE_ALIAS = 'sessions'
+RANGO_SESSION_L1_MAX_ENTRIES = 10000
+RANGO_SESSION_L1_TTL = 5
+
+# How long cached entries live without being invalidated. With the per-process
+# LocMemCache this is how long other workers may lag behind an edit.
+RANGO_SIDEBAR_TIMEOUT = 60 * 15 if RANGO_REDIS_URL else 30
+
+# Category slugs resolved by rango.caching.resolve_category, and how long
+# a slug that does not exist is remembered
+RANGO_SLUG_TIMEOUT = 60 * 15 if RANGO_REDIS_URL else 30
+RANGO_MISSING_SLUG_TIMEOUT = 60 if RANGO_REDIS_URL else 10
+
+# View counters are buffered in memory and written out in batches
+# (see rango/counters.py), every interval seconds or once the threshold
+# of waiting rows is reached
+RANGO_COUNTER_SHARDS = 16
+RANGO_COUNTER_FLUSH_INTERVAL = 5.0
+RANGO_COUNTER_FLUSH_THRESHOLD = 1000
+RANGO_COUNTER_SPOOL_DIR = os.path.join(BASE_DIR, 'counter_spool')
+
+# Clicks through rango:goto wait in a bounded queue (see rango/clicks.py)
+RANGO_CLICK_QUEUE_SIZE = 10000
+RANGO_CLICK_BATCH_SIZE = 500
+
+# Top-N lists for the index page (see rango/leaderboard.py)
+RANGO_LEADERBOARD_SIZE = 5
+RANGO_LEADERBOARD_SLACK = 20
+RANGO_LEADERBOARD_MAX_AGE = 60
+
+# Trending lists for the index page (see rango/trending.py): views and likes
+# counted per bucket, the last BUCKETS kept, each bucket weighing half as much
+# as the one HALF_LIFE seconds newer. Scores are recomputed in the background.
+RANGO_TRENDING_BUCKET_SECONDS = 60 * 60
+RANGO_TRENDING_BUCKETS = 48
+RANGO_TRENDING_HALF_LIFE = 6 * 60 * 60
+RANGO_TRENDING_SIZE = 5
+RANGO_TRENDING_REFRESH_INTERVAL = 60
+
+# Full-text search over the FTS5 table (see rango/search_index.py)
+RANGO_SEARCH_RESULTS_PER_PAGE = 10
+
+# Pages listed per screen on a category page (see rango/pagination.py)
+RANGO_CATEGORY_PAGE_SIZE = 20
+
+# Rows read per query when streaming an export (see rango/export.py)
+RANGO_EXPORT_CHUNK_SIZE = 2000
+
+# Requests per view kept for the rango:stats percentiles
+RANGO_STATS_WINDOW = 1024
+
+# Where the index/about visit counter is kept (see rango/visitors.py):
+# 'cookie' is a signed cookie and costs anonymous visitors no database write,
+# 'session' keeps it in the session and so in the SESSION_ENGINE's store
+RANGO_VISITOR_STORE = 'cookie'
+
+# Longest time an anonymous index/about/category page is served from the
+# cache (see rango/response_cache.py). Edits invalidate it right away in the
+# worker that made them, and everywhere with a shared cache.
+RANGO_RESPONSE_CACHE_TIMEOUT = 60 if RANGO_REDIS_URL else 15
+
+# Profile picture thumbnails, made by background threads (see rango/images.py)
+RANGO_THUMBNAIL_SIZES = (64, 128, 256)
+RANGO_THUMBNAIL_FORMAT = 'WEBP'
+RANGO_THUMBNAIL_QUALITY = 80
+RANGO_IMAGE_WORKERS = 2
+
+# manage.py check_links (see rango/linkcheck.py)
+RANGO_LINKCHECK_CONCURRENCY = 100
+RANGO_LINKCHECK_PER_HOST = 4
+RANGO_LINKCHECK_TIMEOUT = 10
+RANGO_HIDE_DEAD_LINKS = False
+
+# Login throttling (see rango/throttle.py): failed attempts allowed per client
+# IP, and per username from one IP, within the window, counted in the cache
+# below. It must be a cache nothing else writes to, manage.py check warns
+# otherwise. Use one every worker shares in production (RANGO_REDIS_URL).
+RANGO_THROTTLE_CACHE_ALIAS = 'throttle'
+RANGO_LOGIN_WINDOW = 300
+RANGO_LOGIN_IP_LIMIT = 20
+RANGO_LOGIN_USERNAME_LIMIT = 5
+
 
 # Password validation
 # https://docs.djangoproject.com/en/2.1/ref/settings/#auth-password-validators
@@ -107,11 +329,17 @@ AUTH_PASSWORD_VALIDATORS = [
 ]
 
 # Password Hashers
+# The first one hashes new passwords. Stored hashes made by any other one,
+# or with another iteration count, are re-hashed when their user logs in.
+# rango's versions time every hash for the rango:stats view.
 PASSWORD_HASHERS = (
-    'django.contrib.auth.hashers.PBKDF2PasswordHasher',
-    'django.contrib.auth.hashers.PBKDF2SHA1PasswordHasher',
+    'rango.hashers.PBKDF2PasswordHasher',
+    'rango.hashers.PBKDF2SHA1PasswordHasher',
 )
 
+# PBKDF2 rounds, None keeps Django's default
+RANGO_PASSWORD_ITERATIONS = None
+
 # Internationalization
 # https://docs.djangoproject.com/en/2.1/topics/i18n/
 
@@ -129,3 +357,20 @@ STATIC_URL = '/static/'
 LOGIN_URL = 'rango:login'
 MEDIA_ROOT = MEDIA_DIR
 MEDIA_URL = '/media/'
+
+# manage.py collectstatic copies the static files here under names that
+# carry their content hash, with gzip and brotli variants next to them
+# (see rango/assets.py). wsgi.py serves this folder and MEDIA_ROOT itself.
+STATIC_ROOT = os.path.join(BASE_DIR, 'staticfiles')
+
+STORAGES = {
+    'default': {
+        'BACKEND': 'django.core.files.storage.FileSystemStorage',
+    },
+    'staticfiles': {
+        'BACKEND': 'rango.assets.CompressedManifestStaticFilesStorage',
+    },
+}
+
+# Cache lifetime in seconds for served files whose name has no content hash
+RANGO_ASSET_MAX_AGE = 60 * 60
@@ -14,3 +14,12 @@ from django.core.wsgi import get_wsgi_application
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'tango_with_django_project.settings')
 
 application = get_wsgi_application()
+
+# Files under STATIC_URL and MEDIA_URL are answered before Django sees the
+# request (see rango/assets.py), run collectstatic first
+from rango.assets import AssetServer  # noqa: E402
+application = AssetServer(application)
+
+# Compile the rango templates now rather than on this worker's first requests
+from rango import templating  # noqa: E402
+templating.warm()